@@ -9,4 +9,22 @@ class TGUserAdmin(admin.ModelAdmin):
 @admin.register(Transaction)
 class TransactionAdministration(admin.ModelAdmin):
     list_display = ('telegram_payment_charge_id', 'provider_payment_charge_id', 'amount', 'date')
-    search_fields = ('telegram_payment_charge_id', 'provider_payment_charge_id', 'date')
\ No newline at end of file
+    search_fields = ('telegram_payment_charge_id', 'provider_payment_charge_id', 'date')
+
+@admin.register(AnalysisResult)
+class AnalysisResultAdministration(admin.ModelAdmin):
+    list_display = ('key', 'reviews', 'hits', 'created', 'last_used')
+    search_fields = ('key',)
+    exclude = ('result',)
+
+@admin.register(Product)
+class ProductAdministration(admin.ModelAdmin):
+    list_display = ('imt_id', 'name', 'reviews_count', 'feedbacks_count', 'synced')
+    search_fields = ('imt_id', 'name')
+
+@admin.register(Review)
+class ReviewAdministration(admin.ModelAdmin):
+    list_display = ('product', 'position', 'rating', 'created_at', 'source')
+    list_filter = ('rating', 'source')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
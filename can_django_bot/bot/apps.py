@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class BotConfig(AppConfig):
     name = 'bot'
+
+    def ready(self):
+        from django.conf import settings
+
+        # пауки синхронизируют отзывы с моделями Product и Review
+        if settings.FEEDBACK_STORE_DATABASE:
+            from bot.feedback_store import DatabaseFeedbackStore
+            from parsing.feedback_store import set_feedback_store
+
+            set_feedback_store(DatabaseFeedbackStore(batch_size=settings.REVIEW_BULK_BATCH_SIZE, chunk_size=settings.REVIEW_READ_CHUNK_SIZE))
@@ -0,0 +1,159 @@
+import logging
+import typing as tp
+from datetime import timezone as dt_timezone
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from bot.models import Product, Review
+from parsing.feedback_store import is_old, parse_created
+
+
+def format_created(created_at) -> str:
+    """
+        Функция, возвращающая дату отзыва в формате wb (createdDate)
+    """
+
+    return created_at.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+class DatabaseFeedbackStore:
+    """
+        Хранилище отзывов для parsing.feedback_store.FeedbackSync на моделях Product и Review: отметка синхронизации
+        лежит в Product, новые отзывы записываются пачками bulk_create, сохраненные читаются порциями.
+        Методы обращаются к базе синхронно, пауки вызывают их в пуле потоков реактора
+    """
+
+    def __init__(self, batch_size:int=2000, chunk_size:int=5000) -> None:
+        """
+            @batch_size:int - сколько отзывов записывается одним запросом
+            @chunk_size:int - сколько отзывов читается из базы за раз
+        """
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    def mark(self, imt_id:int) -> dict:
+        """
+            Метод получения отметки синхронизации товара, None - отзывы товара не сохранялись
+            @imt_id:int - imtId товара
+        """
+
+        # пауки работают в долгоживущем потоке реактора, где django сам не закрывает оборванные соединения
+        # (вызывается только вне транзакции)
+        close_old_connections()
+
+        product = Product.objects.filter(imt_id=imt_id, synced__isnull=False).values('id', 'reviews_count', 'last_created').first()
+        if product is None:
+            return None
+
+        return self._mark(product['id'], product['reviews_count'], product['last_created'])
+
+    def load(self, imt_id:int) -> tp.Dict[str, list]:
+        """
+            Метод получения сохраненных отзывов товара по колонкам text, rating, created_at
+            @imt_id:int - imtId товара
+        """
+
+        rows = (
+            Review.objects
+            .filter(product__imt_id=imt_id)
+            .order_by('position')
+            .values_list('text', 'rating', 'created_at')
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+        columns = {'text':[], 'rating':[], 'created_at':[]}
+
+        for text, rating, created_at in rows:
+            columns['text'].append(text)
+            columns['rating'].append(rating)
+            columns['created_at'].append(format_created(created_at))
+
+        return columns
+
+    def append(self, imt_id:int, rows:tp.List[tuple], product:dict=None, since:dict=None) -> None:
+        """
+            Метод добавления новых отзывов товара в конец и сдвига отметки синхронизации.
+            Если за время обхода отзывы товара записал другой обход, уже записанные отбрасываются
+            @imt_id:int - imtId товара
+            @rows:list - отзывы (текст, оценка, дата) в порядке dateAsc
+            @product:dict - ссылка, название, фото и количество отзывов товара
+            @since:dict - отметка, по которой отобраны rows (None - не сверять)
+        """
+
+        close_old_connections()
+
+        with transaction.atomic():
+            instance = self._product(imt_id, product)
+
+            # отметка сверяется под блокировкой строки товара: параллельный обход ждет, пока этот не запишет свои отзывы
+            if since is not None:
+                if instance.synced is None:
+                    logging.warning(f'Отзывы товара {imt_id} удалены во время обхода, хранилище не обновлено')
+                    return None
+
+                if (instance.reviews_count, instance.last_created) != (since['count'], since['last_created']):
+                    mark = self._mark(instance.id, instance.reviews_count, instance.last_created)
+                    rows = [row for row in rows if not is_old(mark, *row)]
+
+            self._append(instance, rows)
+
+    def replace(self, imt_id:int, rows:tp.List[tuple], product:dict=None) -> None:
+        """
+            Метод замены всех отзывов товара (полная синхронизация)
+        """
+
+        close_old_connections()
+
+        with transaction.atomic():
+            instance = self._product(imt_id, product)
+
+            Review.objects.filter(product=instance).delete()
+            instance.reviews_count, instance.last_created = 0, None
+
+            self._append(instance, rows)
+
+    def reset(self, imt_id:int) -> None:
+        """
+            Метод удаления отзывов товара, следующий парсинг скачает все отзывы заново
+        """
+
+        close_old_connections()
+
+        with transaction.atomic():
+            Review.objects.filter(product__imt_id=imt_id).delete()
+            Product.objects.filter(imt_id=imt_id).update(reviews_count=0, last_created=None, synced=None)
+
+    def _mark(self, product_id:int, count:int, last_created) -> dict:
+        last_keys = set()
+        if last_created is not None:
+            last_keys = set(Review.objects.filter(product_id=product_id, created_at=last_created).values_list('text', 'rating'))
+
+        return {'count':count, 'last_created':last_created, 'last_keys':last_keys}
+
+    def _product(self, imt_id:int, product:dict=None) -> Product:
+        # блокировка строки товара до конца транзакции: записи обходов одного товара идут по очереди,
+        # и каждая видит количество и дату последнего отзыва после предыдущей
+        instance, _ = Product.objects.select_for_update().get_or_create(imt_id=imt_id)
+
+        for field, value in (product or {}).items():
+            if value is not None:
+                setattr(instance, field, value)
+
+        return instance
+
+    def _append(self, instance:Product, rows:tp.List[tuple]) -> None:
+        Review.objects.bulk_create(
+            (
+                Review(product=instance, position=instance.reviews_count + index, text=text or '', rating=rating, created_at=parse_created(created_at))
+                for index, (text, rating, created_at) in enumerate(rows)
+            ),
+            batch_size=self.batch_size,
+        )
+
+        # новые отзывы всегда позже отметки
+        if rows:
+            instance.last_created = max(parse_created(created_at) for _, _, created_at in rows)
+
+        instance.reviews_count += len(rows)
+        instance.synced = timezone.now()
+        instance.save()
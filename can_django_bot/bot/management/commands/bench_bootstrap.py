@@ -0,0 +1,74 @@
+import re
+import time
+
+import dukpy
+from django.core.management.base import BaseCommand
+from scrapy.selector import Selector
+
+from parsing.bootstrap import extract_product_info, product_info_cache
+
+
+def reference_product_info(products_data_js:str) -> dict:
+    """
+        Исходная реализация WildberriesCommentsSpider.load_product_info (двойное вычисление init в dukpy), эталон для сравнения
+    """
+
+    info = {'imt_id':None, 'feedbacks_count':0, 'name':None, 'photo':None}
+
+    products_data_js = re.sub('\n', '', products_data_js)
+    products_data_js = re.sub(r'\s{2,}', '', products_data_js)
+
+    products_data_js = re.sub('routes: routes,', '', products_data_js)
+    products_data_js = re.sub('routesDictionary: routesDictionary,', '', products_data_js)
+    products_data_js = re.sub('tmplHashes: tmplHashes', '', products_data_js)
+
+    products_init = re.findall(r'wb\.spa\.init\(({.*?})\);', products_data_js)[0]
+
+    if products_init is not None and str(products_init) != '':
+        interpreter = dukpy.JSInterpreter()
+
+        evaled_data = interpreter.evaljs(f'init={products_init};init.router;')
+        evaled_data2 = interpreter.evaljs(f'init={products_init};init.seoHelper;')
+
+        if 'ssrModel' in evaled_data.keys():
+            info['imt_id'] = evaled_data['ssrModel']['product']['imtId']
+            info['feedbacks_count'] = evaled_data['ssrModel']['product']['feedbacks']
+            info['name'] = evaled_data['ssrModel']['product']['goodsName']
+
+        if 'items' in evaled_data2.keys():
+            info['photo'] = evaled_data2['items'][4]['attributesDictionary']['content']
+
+    return info
+
+class Command(BaseCommand):
+    help = 'Сравнение извлечения метаданных товара из wb.spa.init с исходным (dukpy два раза) по скорости и результату'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Сохраненные html страницы товаров Wildberries')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+
+    def handle(self, *args, **kwargs):
+        for path in kwargs['paths']:
+            with open(path) as f:
+                script = Selector(text=f.read()).xpath('//script[contains(., "wb.spa.init")]/text()').get()
+
+            start = time.perf_counter()
+            for _ in range(kwargs['repeat']):
+                expected = reference_product_info(script)
+            reference_time = (time.perf_counter() - start) / kwargs['repeat']
+
+            start = time.perf_counter()
+            for _ in range(kwargs['repeat']):
+                result = extract_product_info(script)
+            extractor_time = (time.perf_counter() - start) / kwargs['repeat']
+
+            # повторный парсинг товара берет метаданные из кэша и не скачивает страницу
+            product_info_cache.set(path, result)
+            start = time.perf_counter()
+            product_info_cache.get(path)
+            cache_time = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{path}: reference={reference_time * 1000:.1f}ms extractor={extractor_time * 1000:.1f}ms '
+                f'cache={cache_time * 1000:.3f}ms speedup={reference_time / max(extractor_time, 1e-9):.1f}x identical={expected == result}'
+            )
@@ -0,0 +1,65 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+
+from nn_models.ML import CAN_ML
+from nn_models.clustering import radius_clusters
+from nn_models.profiling import StageProfiler
+
+
+def load_reviews(path:str) -> pd.DataFrame:
+    """
+        Функция загрузки отзывов (колонки review, rate) из csv или json, сохраненного из parse_wb_product
+        @path:str - путь к файлу
+    """
+
+    if path.endswith('.csv'):
+        data = pd.read_csv(path)
+    else:
+        data = pd.read_json(path)
+
+    data.reset_index(drop=True, inplace=True)
+    return data[['review', 'rate']]
+
+class Command(BaseCommand):
+    help = 'Сравнение DBSCAN и блочной кластеризации по скорости, пику памяти и меткам на реальных отзывах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы с отзывами (csv/json с колонками review, rate)')
+        parser.add_argument('--working-memory', type=int, default=64, help='Размер блока матрицы расстояний в МБ')
+
+    def handle(self, *args, **kwargs):
+        ml = CAN_ML.from_registry()
+
+        for path in kwargs['paths']:
+            data = load_reviews(path)
+            _, review_bigrams = ml.preprocess(data['review'].values)
+            positive = (data['rate'] > 3).values
+
+            for polarity, mask, eps in (('positive', positive, ml.pos_eps), ('negative', ~positive, ml.neg_eps)):
+                normal_bigrams = list(chain.from_iterable(bigrams for bigrams, selected in zip(review_bigrams, mask) if selected))
+                _, embs = ml.classify_bigrams(normal_bigrams)
+
+                if not embs.shape[0]:
+                    continue
+
+                # пик памяти через tracemalloc (numpy учитывается), время с трассировкой немного выше реального
+                profiler = StageProfiler(trace_memory=True)
+
+                with profiler.stage('dbscan') as dbscan:
+                    expected = DBSCAN(eps=eps, min_samples=1).fit(embs).labels_
+
+                with profiler.stage('radius') as radius:
+                    labels = radius_clusters(embs, eps=eps, working_memory=kwargs['working_memory'])
+
+                self.stdout.write(
+                    f'{path} {polarity}: bigrams={embs.shape[0]} clusters={len(np.unique(labels))} '
+                    f'dbscan={dbscan["wall"]:.3f}s/{dbscan["peak_memory"] / 2 ** 20:.0f}MB '
+                    f'radius={radius["wall"]:.3f}s/{radius["peak_memory"] / 2 ** 20:.0f}MB '
+                    f'same_labels={np.array_equal(expected, labels)} ari={adjusted_rand_score(expected, labels):.4f}'
+                )
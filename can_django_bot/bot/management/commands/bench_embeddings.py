@@ -0,0 +1,76 @@
+import time
+import tracemalloc
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nn_models.ML import CAN_ML
+from nn_models.compact import EMBEDDING_MODES
+from nn_models.morph_cache import MorphTagCache
+from nn_models.registry import registry
+from nn_models.synthetic import generate_reviews, reference_models
+from bot.management.commands.benchmark import normalize_report
+
+
+class Command(BaseCommand):
+    help = 'Сравнение режимов хранения эмбеддингов биграм (float32/float16/int8): память, время и совпадение отчетов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Размеры синтетических корпусов')
+        parser.add_argument('--models', choices=['reference', 'local'], default='local', help='reference - эталонные модели из nn_models.synthetic, local - модели из settings')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генерации корпуса и выбора биграм')
+        parser.add_argument('--modes', nargs='+', default=list(EMBEDDING_MODES), choices=EMBEDDING_MODES, help='Режимы эмбеддингов')
+
+    def handle(self, *args, **kwargs):
+        # отчеты сверяются с float32, поэтому он считается первым
+        modes = ['float32'] + [mode for mode in dict.fromkeys(kwargs['modes']) if mode != 'float32']
+        failed = []
+
+        for size in kwargs['sizes']:
+            data = generate_reviews(size, seed=kwargs['seed'])
+            reference = None
+
+            for mode in modes:
+                models = {}
+                if kwargs['models'] == 'reference':
+                    models['emb_model'], models['classifier'] = reference_models(kwargs['seed'])
+
+                ml = CAN_ML.from_registry(
+                    **models,
+                    tag_cache=MorphTagCache(registry.get('MORPH')),
+                    feature_store=None,
+                    random_state=kwargs['seed'],
+                    embedding_mode=mode,
+                )
+
+                # матрицы эмбеддингов уникальных биграм обеих тональностей
+                _, review_bigrams = ml.preprocess(data['review'].values)
+                positive = (data['rate'] > 3).values
+                occurrences, embs_bytes = 0, 0
+                for is_positive in (True, False):
+                    normal_bigrams = list(chain.from_iterable(bigrams for bigrams, flag in zip(review_bigrams, positive) if flag == is_positive))
+                    occurrences += len(normal_bigrams)
+                    embs_bytes += ml.bigram_features(list(dict.fromkeys(normal_bigrams)))[0].nbytes
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                report = normalize_report(ml.run(data.copy()))
+                wall = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                if reference is None:
+                    reference = report
+                elif report != reference:
+                    failed.append((size, mode))
+
+                # исходный вариант: float64 вектор на каждое вхождение биграммы
+                legacy_bytes = occurrences * ml.embedder.dim * 8
+
+                self.stdout.write(
+                    f'size={size} mode={mode:<8} embeddings={embs_bytes / 2 ** 20:8.2f}MB (float64 на вхождение {legacy_bytes / 2 ** 20:.2f}MB) '
+                    f'peak={peak / 2 ** 20:8.2f}MB wall={wall:.2f}s identical={report == reference}'
+                )
+
+        if failed:
+            raise CommandError(f'Отчеты разошлись с float32 (size, mode): {failed}. int8 квантует эмбеддинги с потерями и может менять отчеты')
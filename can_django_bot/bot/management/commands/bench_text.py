@@ -0,0 +1,59 @@
+import re
+import time
+
+import emoji
+from django.core.management.base import BaseCommand
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from nn_models.text import normalizer
+from bot.management.commands.bench_clustering import load_reviews
+
+
+def reference_remove_garbage(text:str) -> str:
+    """
+        Исходная реализация CAN_ML.remove_garbage, эталон для сравнения
+    """
+
+    allchars = [str for str in text]
+    emoji_list = [c for c in allchars if c in emoji.UNICODE_EMOJI]
+    clean_text = ' '.join([str for str in text.split() if not any(i in str for i in emoji_list)])
+
+    return re.sub(r'\d', ' ', re.sub(r'[^\w\s]',' ',clean_text.strip().lower()))
+
+def reference_process(texts:list) -> tuple:
+    """
+        Исходный путь: remove_garbage через DataFrame.apply, затем sent_tokenize и word_tokenize
+    """
+
+    clean_texts = [reference_remove_garbage(text) for text in texts]
+    sentences = [[word_tokenize(sentence) for sentence in sent_tokenize(text)] for text in clean_texts]
+
+    return clean_texts, sentences
+
+class Command(BaseCommand):
+    help = 'Сравнение новой очистки и токенизации отзывов с исходной по скорости и результату'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы с отзывами (csv/json с колонками review, rate)')
+
+    def handle(self, *args, **kwargs):
+        for path in kwargs['paths']:
+            texts = list(load_reviews(path)['review'].values)
+
+            start = time.perf_counter()
+            expected = reference_process(texts)
+            reference_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = normalizer.process(texts)
+            normalizer_time = time.perf_counter() - start
+
+            mismatches = [i for i in range(len(texts)) if expected[0][i] != result[0][i] or expected[1][i] != result[1][i]]
+
+            self.stdout.write(
+                f'{path}: reviews={len(texts)} reference={reference_time:.3f}s normalizer={normalizer_time:.3f}s '
+                f'speedup={reference_time / max(normalizer_time, 1e-9):.1f}x identical={not mismatches}'
+            )
+
+            for i in mismatches[:10]:
+                self.stdout.write(f'  #{i}: {expected[1][i]!r} != {result[1][i]!r}')
@@ -0,0 +1,146 @@
+import json
+import os
+import resource
+import subprocess
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nn_models.ML import CAN_ML
+from nn_models.morph_cache import MorphTagCache
+from nn_models.registry import registry
+from nn_models.profiling import register_profile_callback, unregister_profile_callback
+from nn_models.synthetic import generate_reviews, reference_models
+
+# эталонные отчеты исходного алгоритма на эталонных моделях, хранятся в репозитории
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'benchmark_golden')
+
+
+def normalize_report(report:dict) -> dict:
+    """
+        Функция приведения отчета к виду json (numpy типы -> python), чтобы сравнивать с эталоном
+    """
+
+    return json.loads(json.dumps(report, ensure_ascii=False, default=lambda value: value.item()))
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Command(BaseCommand):
+    help = 'Бенчмарк анализа отзывов на синтетических корпусах: скорость, память по этапам и сверка с эталонными отчетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Размеры корпусов')
+        parser.add_argument('--models', choices=['reference', 'local'], default='reference', help='reference - эталонные модели из nn_models.synthetic (со сверкой), local - модели из settings (только замеры)')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генерации корпуса и выбора биграм')
+        parser.add_argument('--stream', type=int, default=0, help='Размер порции для run_stream (0 - обычный run)')
+        parser.add_argument('--trace-memory', action='store_true', help='Пик памяти по этапам через tracemalloc')
+        parser.add_argument('--output', default='./benchmarks', help='Каталог результатов')
+        parser.add_argument('--golden-dir', default=GOLDEN_DIR, help='Каталог эталонных отчетов')
+        parser.add_argument('--skip-golden', action='store_true', help='Не сверять отчеты (например для размеров без эталона)')
+        parser.add_argument('--update-golden', action='store_true', help='Перезаписать эталонные отчеты (только при намеренном изменении алгоритма)')
+
+    def handle(self, *args, **kwargs):
+        os.makedirs(kwargs['output'], exist_ok=True)
+        results_path = os.path.join(kwargs['output'], 'results.jsonl')
+
+        profiles = []
+        register_profile_callback(profiles.append)
+
+        failed = []
+
+        try:
+            for size in kwargs['sizes']:
+                data = generate_reviews(size, seed=kwargs['seed'])
+
+                models = {}
+                if kwargs['models'] == 'reference':
+                    models['emb_model'], models['classifier'] = reference_models(kwargs['seed'])
+
+                # без общих кэшей, чтобы замеры не зависели от предыдущих запусков
+                ml = CAN_ML.from_registry(
+                    **models,
+                    tag_cache=MorphTagCache(registry.get('MORPH')),
+                    feature_store=None,
+                    random_state=kwargs['seed'],
+                    job=f'benchmark:{size}',
+                    profile_memory=kwargs['trace_memory'],
+                )
+
+                start = time.perf_counter()
+                if kwargs['stream']:
+                    chunk_size = kwargs['stream']
+                    report = ml.run_stream(data.iloc[i:i + chunk_size] for i in range(0, size, chunk_size))
+                else:
+                    report = ml.run(data)
+                wall = time.perf_counter() - start
+
+                golden = None
+                if kwargs['models'] == 'reference' and not kwargs['skip_golden']:
+                    golden = self.check_golden(normalize_report(report), size, kwargs)
+
+                if golden is False:
+                    failed.append(size)
+
+                result = {
+                    'date':datetime.utcnow().isoformat(),
+                    'revision':git_revision(),
+                    'size':size,
+                    'seed':kwargs['seed'],
+                    'mode':f'stream:{kwargs["stream"]}' if kwargs['stream'] else 'run',
+                    'models':kwargs['models'],
+                    'wall':wall,
+                    'reviews_per_second':size / wall,
+                    'max_rss_kb':resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                    'good_points':len(report['good_points']),
+                    'bad_points':len(report['bad_points']),
+                    'golden':golden,
+                    'stages':profiles[-1]['stages'] if profiles else [],
+                }
+
+                with open(results_path, 'a') as f:
+                    f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+                self.stdout.write(f'size={size} wall={wall:.2f}s {result["reviews_per_second"]:.0f} reviews/s max_rss={result["max_rss_kb"]}KB golden={golden}')
+                for stage in result['stages']:
+                    self.stdout.write(f'    {stage["stage"]:<15}{stage["polarity"] or "":<10}{stage["wall"]:>9.3f}s {stage["items"]:>10} items')
+        finally:
+            unregister_profile_callback(profiles.append)
+
+        if failed:
+            raise CommandError(f'Отчеты не совпали с эталоном для размеров {failed}')
+
+    def check_golden(self, report:dict, size:int, kwargs:dict):
+        """
+            Сверка отчета с эталоном: True - совпал, False - отличается или эталона нет, None - эталон перезаписан
+        """
+
+        path = os.path.join(kwargs['golden_dir'], f'golden_{size}_{kwargs["seed"]}.json')
+
+        if kwargs['update_golden']:
+            os.makedirs(kwargs['golden_dir'], exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+            return None
+
+        if not os.path.exists(path):
+            self.stdout.write(f'  нет эталона {path}: сверка невозможна (--skip-golden, чтобы только замерить)')
+            return False
+
+        with open(path) as f:
+            golden = json.load(f)
+
+        if golden == report:
+            return True
+
+        for section in ('good_points', 'bad_points'):
+            missing = set(golden[section]) - set(report[section])
+            extra = set(report[section]) - set(golden[section])
+            changed = [key for key in set(golden[section]) & set(report[section]) if golden[section][key] != report[section][key]]
+            self.stdout.write(f'  {section}: пропали {sorted(missing)}, появились {sorted(extra)}, изменились {sorted(changed)}')
+
+        return False
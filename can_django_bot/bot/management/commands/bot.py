@@ -1,4 +1,5 @@
 import re
+import typing as tp
 import pandas as pd
 from django.core.management.base import BaseCommand
 from django.conf import settings
@@ -12,12 +13,17 @@ from telegram.utils.request import Request
 
 from bot.models import *
 from bot.report_generation import generate_report
+from bot.result_cache import analysis_key, get_cached_result, store_result
 
 from telegram.ext.dispatcher import run_async
 
-from parsing.wb_category_crawler import parse_product_category
+from parsing.wb_category_crawler import stream_product_category
+from parsing.wb_crawler import crawl_products
+from parsing.feedback_buffer import split_stream
 
 from nn_models.ML import CAN_ML
+from nn_models.parallel import shutdown_preprocess_pool
+from nn_models.registry import registry
 
 import logging
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
@@ -535,7 +541,7 @@ def analize(update: Update, context: CallbackContext):
             )
 
         try:
-            prod_links, title = parse_product_category(cat_link) 
+            title, prod_links = stream_product_category(cat_link, max_products=settings.CATEGORY_MAX_PRODUCTS, workers=settings.CATEGORY_CONCURRENCY)
         except Exception as e:
             logging.error(f'{e} возникла во время парсинга ссылок на товары категории для пользователя {user.username}')
             
@@ -545,35 +551,63 @@ def analize(update: Update, context: CallbackContext):
                 parse_mode=ParseMode.HTML,
             )
 
-        end_df = pd.DataFrame({})
         images = []
         loading_emoji = ['⏰', '⚙️', '🔪', '👻', '💣', '🔮']
 
-        for index, link in enumerate(prod_links):
-            if (index + 1) == 1:
-                message_to_edit = context.bot.send_message(
-                    chat_id=user.external_id,
-                    text=f'{choice(loading_emoji)} Процесс сбора завершен на <b>{(index + 1)}%</b>. Собрано <b>{end_df.shape[0]}</b> отзывов.',
-                    parse_mode=ParseMode.HTML,
-            )
-
-            else:
-                context.bot.edit_message_text(
-                    chat_id=user.external_id,
-                    message_id=message_to_edit.message_id, 
-                    text=f'{choice(loading_emoji)} Процесс сбора завершен на <b>{(index + 1)}%</b>. Собрано <b>{end_df.shape[0]}</b> отзывов.',
-                    parse_mode=ParseMode.HTML,
+        # сколько ссылок отдано парсеру товаров: в категории может быть меньше CATEGORY_MAX_PRODUCTS товаров,
+        # поэтому итог известен только после последней страницы категории
+        submitted = {'count':0, 'done':False}
+
+        def count_links(links):
+            for link in links:
+                submitted['count'] += 1
+                yield link
+
+            submitted['done'] = True
+
+        def category_frames():
+            """
+                Генератор таблиц отзывов товаров категории по мере готовности, анализ забирает их порциями,
+                пока парсятся следующие товары
+            """
+
+            collected = 0
+
+            for index, (link, buffer) in enumerate(crawl_products(count_links(prod_links), concurrency=settings.CATEGORY_CONCURRENCY)):
+                data = None
+
+                try:
+                    data = buffer.wait(0)
+                    images.append(buffer.photo)
+                    collected += data.shape[0]
+                except Exception as e:
+                    logging.error(f'{e} возникла во время сбора данных на товар {link} из категории для пользователя {user.username}')
+
+                if submitted['done']:
+                    progress = f'завершен на <b>{min(100, round((index + 1) / max(1, submitted["count"]) * 100))}%</b>'
+                else:
+                    progress = f'идет: готово <b>{index + 1}</b> из <b>{submitted["count"]}</b> найденных товаров'
+
+                if (index + 1) == 1:
+                    message_to_edit = context.bot.send_message(
+                        chat_id=user.external_id,
+                        text=f'{choice(loading_emoji)} Процесс сбора {progress}. Собрано <b>{collected}</b> отзывов.',
+                        parse_mode=ParseMode.HTML,
                 )
 
-            try:
-                _, image, data = api_parse(link)
-                images.append(image)
-                end_df = pd.concat([end_df, data])
-            except Exception as e:
-                logging.error(f'{e} возникла во время сбора данных на товар из категории для пользователя {user.username}')
-                continue
-        
-        analize_df(user, context, title, choice(images), end_df, settings.CATEGORY_REVIEW_PRICE)
+                else:
+                    context.bot.edit_message_text(
+                        chat_id=user.external_id,
+                        message_id=message_to_edit.message_id, 
+                        text=f'{choice(loading_emoji)} Процесс сбора {progress}. Собрано <b>{collected}</b> отзывов.',
+                        parse_mode=ParseMode.HTML,
+                    )
+
+                if data is not None:
+                    yield data
+
+        # картинка для отчета выбирается, когда все товары собраны
+        analize_df(user, context, title, images, category_frames(), settings.CATEGORY_REVIEW_PRICE)
 
     elif 'тов' in txt:
         context.bot.send_message(
@@ -619,14 +653,22 @@ def analize(update: Update, context: CallbackContext):
     
 @log_errors
 @run_async
-def analize_df(user, context: CallbackContext, name:str, image:str, data:pd.DataFrame, price:int):
+def analize_df(user, context: CallbackContext, name:str, image:tp.Union[str, list], data:tp.Union[pd.DataFrame, tp.Iterable[pd.DataFrame]], price:int):
     """
-        Функция проведения анализа одного товара
+        Функция проведения анализа одного товара или категории
+        @image:str|list - картинка для отчета или список, из которого она выбирается после сбора
+        @data:DataFrame|Iterable[DataFrame] - отзывы или поток таблиц отзывов товаров категории по мере парсинга
     """
 
     logging.warning(f'Начинаю анализ для {user.username}')
 
-    if data.shape[0] < 100:
+    # большие выборки обрабатываются порциями с ограниченной памятью вместо урезания до 10000 отзывов,
+    # поток товаров категории уходит в анализ порциями, не дожидаясь конца парсинга
+    chunks = None
+    if not isinstance(data, pd.DataFrame):
+        data, chunks = split_stream(data, settings.ML_STREAM_CHUNK_SIZE)
+
+    if chunks is None and data.shape[0] < 100:
         context.bot.send_message(
             chat_id=user.external_id,
             text=f'🥲 К сожалению, мы не можем проанализировать данный товар, поскольку на нем слишком мало отзывов. ',
@@ -635,13 +677,12 @@ def analize_df(user, context: CallbackContext, name:str, image:str, data:pd.Data
     else:
         success_data_prepare_msg = context.bot.send_message(
             chat_id=user.external_id,
-            text=f'🦾 Данные готовы к анализу. Всего было собрано <b>{data.shape[0]}</b> отзывов.\nКак только бот закончит, он пришлет вам уведомление о завершении анализа.',
+            text=f'🦾 Данные готовы к анализу. Всего было собрано <b>{data.shape[0]}</b> отзывов.\nКак только бот закончит, он пришлет вам уведомление о завершении анализа.'
+                if chunks is None else
+                f'🦾 Начинаем анализ, не дожидаясь конца сбора: собрано больше <b>{settings.ML_STREAM_CHUNK_SIZE}</b> отзывов.\nКак только бот закончит, он пришлет вам уведомление о завершении анализа.',
             parse_mode=ParseMode.HTML,
         )
 
-        if data.shape[0] > 10000:
-            data = data.sample(n=10000)
-
         if user.balance < price:
             context.bot.send_message(
                 chat_id=user.external_id,
@@ -660,8 +701,35 @@ def analize_df(user, context: CallbackContext, name:str, image:str, data:pd.Data
             user.save()
 
             try:
-                ml = CAN_ML(classifier=settings.CLASSIFIER, emb_model=settings.EMB_MODEL, stemmer=settings.STEMMER, morph=settings.MORPH)
-                out = ml.run(data)
+                chunk_size = settings.ML_STREAM_CHUNK_SIZE if chunks is not None or data.shape[0] > settings.ML_STREAM_CHUNK_SIZE else None
+
+                # тот же набор отзывов недавно уже анализировали - отдаем сохраненный результат, без кэша анализ все равно выполняется.
+                # Ключ потока категории известен только после сбора всех отзывов, поэтому поток в кэш не попадает
+                key, out = None, None
+                if chunks is None:
+                    try:
+                        key = analysis_key(data, settings.ML_RANDOM_STATE, chunk_size)
+                        out = get_cached_result(key)
+                    except Exception as e:
+                        logging.error(f'{e} возникла во время чтения кэша результатов для пользователя {user.username}')
+
+                if out is None:
+                    ml = CAN_ML.from_registry(workers=settings.ML_WORKERS, random_state=settings.ML_RANDOM_STATE, job=f'{user.external_id}:{name}', profile_memory=settings.ML_PROFILE_MEMORY, embedding_mode=settings.ML_EMBEDDING_MODE)
+
+                    if chunks is not None:
+                        out = ml.run_stream(chunks)
+                    elif chunk_size:
+                        out = ml.run_stream(data.iloc[start:start + chunk_size] for start in range(0, data.shape[0], chunk_size))
+                    else:
+                        out = ml.run(data)
+
+                    if key is not None:
+                        try:
+                            store_result(key, out, data.shape[0])
+                        except Exception as e:
+                            logging.error(f'{e} возникла во время сохранения результата анализа в кэш для пользователя {user.username}')
+                else:
+                    logging.warning(f'Результат анализа для {user.username} взят из кэша')
                         
                 context.bot.edit_message_text(
                     chat_id=user.external_id,
@@ -669,7 +737,7 @@ def analize_df(user, context: CallbackContext, name:str, image:str, data:pd.Data
                     text='🪛 Анализ прошел успешно... \nГотовим отчет...'
                 )
 
-                pdf = generate_report(out, image, name)
+                pdf = generate_report(out, choice(image) if isinstance(image, list) else image, name)
 
                 context.bot.send_document(
                     chat_id=user.external_id,
@@ -900,6 +968,9 @@ class Command(BaseCommand):
     help = 'Команда запуска телеграм бота'
 
     def handle(self, *args, **kwargs):
+        #0 - загрузить модели до первого запроса, а не в потоке анализа
+        registry.warm_up()
+
         #1 - правильное подключение
         request = Request(
             con_pool_size=20,
@@ -1005,3 +1076,8 @@ class Command(BaseCommand):
         #3 - запустить бесконечную обработку входящих сообщений
         updater.start_polling(drop_pending_updates=True)
         updater.idle()
+
+        #4 - сохранить кэш частей речи до следующего запуска
+        if registry.loaded('MORPH_CACHE'):
+            registry.get('MORPH_CACHE').save()
+        shutdown_preprocess_pool()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from navec import Navec
+
+from nn_models.mmap_navec import convert_navec
+
+
+class Command(BaseCommand):
+    help = 'Конвертация Navec в хранилище для общего чтения через memory map'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=settings.EMBEDDING_MODEL_PATH, help='Архив Navec')
+        parser.add_argument('--target', default=settings.EMB_STORE_PATH, help='Каталог хранилища')
+
+    def handle(self, *args, **kwargs):
+        convert_navec(Navec.load(kwargs['source']), kwargs['target'])
+        self.stdout.write(f'Хранилище эмбеддингов сохранено в {kwargs["target"]}, перезапустите бота и веб сервер')
@@ -0,0 +1,33 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from nn_models.inference import InferenceServer
+from nn_models.registry import load_local_classifier, load_local_emb_model
+
+
+class Command(BaseCommand):
+    help = 'Сервер инференса: держит эмбеддинги и классификатор и объединяет запросы бота в общие пачки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.INFERENCE_SOCKET or './nn_models/inference.sock', help='Путь к unix сокету')
+        parser.add_argument('--max-batch', type=int, default=settings.INFERENCE_MAX_BATCH, help='Максимальное количество строк в пачке')
+        parser.add_argument('--max-delay', type=float, default=settings.INFERENCE_MAX_DELAY, help='Сколько секунд запрос ждет попутчиков')
+
+    def handle(self, *args, **kwargs):
+        server = InferenceServer(
+            emb_model=load_local_emb_model(),
+            classifier=load_local_classifier(),
+            path=kwargs['socket'],
+            authkey=settings.INFERENCE_AUTHKEY,
+            max_batch=kwargs['max_batch'],
+            max_delay=kwargs['max_delay'],
+        )
+
+        # первый predict catboost заметно дольше остальных
+        server.predictor.submit(np.zeros((1, server.index.dim), dtype=np.float32))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(f'Статистика пачек: {server.handle("stats", ())}')
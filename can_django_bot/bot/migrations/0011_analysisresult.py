@@ -0,0 +1,29 @@
+# Generated by Django 4.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0010_tguser_is_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Хэш отзывов, версии моделей и зерна')),
+                ('result', models.JSONField(verbose_name='Результат анализа (good_points, bad_points)')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Количество повторных выдач')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата и время анализа')),
+                ('last_used', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата и время последней выдачи')),
+            ],
+            options={
+                'verbose_name': 'Результат анализа',
+                'verbose_name_plural': 'Результаты анализа',
+            },
+        ),
+    ]
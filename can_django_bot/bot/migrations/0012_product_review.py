@@ -0,0 +1,56 @@
+# Generated by Django 4.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0011_analysisresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imt_id', models.PositiveBigIntegerField(unique=True, verbose_name='imtId товара на wb')),
+                ('url', models.CharField(max_length=512, null=True, verbose_name='Ссылка на товар')),
+                ('name', models.CharField(max_length=512, null=True, verbose_name='Название товара')),
+                ('photo', models.CharField(max_length=512, null=True, verbose_name='Фото товара')),
+                ('feedbacks_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов на wb')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Количество сохраненных отзывов')),
+                ('last_created', models.DateTimeField(null=True, verbose_name='Дата последнего сохраненного отзыва')),
+                ('synced', models.DateTimeField(db_index=True, null=True, verbose_name='Дата и время синхронизации отзывов')),
+            ],
+            options={
+                'verbose_name': 'Товар',
+                'verbose_name_plural': 'Товары',
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('position', models.PositiveIntegerField(verbose_name='Номер отзыва товара в порядке dateAsc')),
+                ('text', models.TextField(verbose_name='Текст отзыва')),
+                ('rating', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('created_at', models.DateTimeField(verbose_name='Дата отзыва')),
+                ('source', models.CharField(default='wb', max_length=32, verbose_name='Источник')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='bot.product')),
+            ],
+            options={
+                'verbose_name': 'Отзыв',
+                'verbose_name_plural': 'Отзывы',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'created_at'], name='review_product_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=['product', 'position'], name='review_product_position'),
+        ),
+    ]
@@ -80,3 +80,143 @@ class Transaction(models.Model):
     class Meta:
         verbose_name = 'Транзакция'
         verbose_name_plural = 'Транзакции'
+
+class AnalysisResult(models.Model):
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Хэш отзывов, версии моделей и зерна'
+    )
+
+    result = models.JSONField(
+        verbose_name='Результат анализа (good_points, bad_points)'
+    )
+
+    reviews = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+
+    hits = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество повторных выдач'
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата и время анализа'
+    )
+
+    last_used = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата и время последней выдачи'
+    )
+
+    def __str__(self):
+        return f"#{self.key[:12]} {self.reviews} {self.created}"
+
+    class Meta:
+        verbose_name = 'Результат анализа'
+        verbose_name_plural = 'Результаты анализа'
+
+class Product(models.Model):
+    imt_id = models.PositiveBigIntegerField(
+        unique=True,
+        verbose_name='imtId товара на wb'
+    )
+
+    url = models.CharField(
+        max_length=512,
+        null=True,
+        verbose_name='Ссылка на товар'
+    )
+
+    name = models.CharField(
+        max_length=512,
+        null=True,
+        verbose_name='Название товара'
+    )
+
+    photo = models.CharField(
+        max_length=512,
+        null=True,
+        verbose_name='Фото товара'
+    )
+
+    feedbacks_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов на wb'
+    )
+
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество сохраненных отзывов'
+    )
+
+    last_created = models.DateTimeField(
+        null=True,
+        verbose_name='Дата последнего сохраненного отзыва'
+    )
+
+    synced = models.DateTimeField(
+        null=True,
+        db_index=True,
+        verbose_name='Дата и время синхронизации отзывов'
+    )
+
+    def __str__(self):
+        return f"#{self.imt_id} {self.name}"
+
+    class Meta:
+        verbose_name = 'Товар'
+        verbose_name_plural = 'Товары'
+
+class Review(models.Model):
+    id = models.BigAutoField(
+        primary_key=True
+    )
+
+    # индекс по товару дает уникальность (product, position)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='reviews',
+        db_index=False
+    )
+
+    position = models.PositiveIntegerField(
+        verbose_name='Номер отзыва товара в порядке dateAsc'
+    )
+
+    text = models.TextField(
+        verbose_name='Текст отзыва'
+    )
+
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='Оценка'
+    )
+
+    created_at = models.DateTimeField(
+        verbose_name='Дата отзыва'
+    )
+
+    source = models.CharField(
+        max_length=32,
+        default='wb',
+        verbose_name='Источник'
+    )
+
+    def __str__(self):
+        return f"#{self.product_id} {self.rating} {self.created_at}"
+
+    class Meta:
+        verbose_name = 'Отзыв'
+        verbose_name_plural = 'Отзывы'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'position'], name='review_product_position'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='review_product_created'),
+        ]
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from bot.models import AnalysisResult
+from nn_models.feature_store import files_fingerprint
+
+# меняется вместе с алгоритмом анализа, чтобы не выдавать результаты старой версии
+ANALYSIS_VERSION = 1
+
+def model_version() -> str:
+    """
+        Функция, возвращающая версию анализа: алгоритм, файлы моделей и режим эмбеддингов
+    """
+
+    fingerprint = files_fingerprint([settings.EMBEDDING_MODEL_PATH, settings.CLASSIFIER_PATH])
+    return f'{ANALYSIS_VERSION}:{fingerprint}:{settings.ML_EMBEDDING_MODE}'
+
+def analysis_key(data:pd.DataFrame, seed:int=None, chunk_size:int=None) -> str:
+    """
+        Функция, возвращающая ключ результата: хэш отзывов, версии моделей, зерна и режима анализа.
+        Строки хэшируются в исходном порядке: примеры предложений отчета ищутся по отзывам по порядку, и от него зависит результат
+        @data:pd.DataFrame - отзывы (колонки review, rate)
+        @seed:int - зерно выбора биграм
+        @chunk_size:int - размер порции run_stream (None - обычный run), порции меняют выбор биграм и отчет
+    """
+
+    mode = f'stream:{chunk_size}' if chunk_size else 'run'
+
+    digest = hashlib.sha256(f'{model_version()}\n{seed}\n{mode}\n'.encode())
+    for review, rate in zip(data['review'].values, data['rate'].values):
+        digest.update(f'{rate}\t{review}'.encode())
+        digest.update(b'\n')
+
+    return digest.hexdigest()
+
+def get_cached_result(key:str) -> dict:
+    """
+        Функция получения сохраненного результата анализа, None - результата нет или он устарел
+        @key:str - ключ из analysis_key
+    """
+
+    fresh = AnalysisResult.objects.filter(key=key, created__gte=timezone.now() - timedelta(seconds=settings.RESULT_CACHE_TTL))
+    result = fresh.values_list('result', flat=True).first()
+
+    if result is not None:
+        fresh.update(hits=F('hits') + 1, last_used=timezone.now())
+
+    return result
+
+def store_result(key:str, result:dict, reviews:int) -> None:
+    """
+        Функция сохранения результата анализа и вытеснения устаревших и давно не запрашиваемых записей
+        @key:str - ключ из analysis_key
+        @result:dict - словарь с good_points и bad_points
+        @reviews:int - количество отзывов
+    """
+
+    # numpy типы (оценки, средние) -> python, чтобы записать в JSONField
+    result = json.loads(json.dumps(result, ensure_ascii=False, default=lambda value: value.item() if isinstance(value, np.generic) else str(value)))
+
+    AnalysisResult.objects.update_or_create(
+        key=key,
+        defaults={'result':result, 'reviews':reviews, 'hits':0, 'created':timezone.now(), 'last_used':timezone.now()},
+    )
+
+    AnalysisResult.objects.filter(created__lt=timezone.now() - timedelta(seconds=settings.RESULT_CACHE_TTL)).delete()
+
+    stale = list(AnalysisResult.objects.order_by('-last_used').values_list('id', flat=True)[settings.RESULT_CACHE_MAX_ENTRIES:])
+    if stale:
+        AnalysisResult.objects.filter(id__in=stale).delete()
+        logging.warning(f'Из кэша результатов вытеснено {len(stale)} записей')
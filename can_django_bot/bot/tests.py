@@ -1,3 +1,91 @@
-from django.test import TestCase
+import os
+import tempfile
 
+from django.test import SimpleTestCase, TestCase
 
+from bot.feedback_store import DatabaseFeedbackStore
+from bot.models import Review
+from parsing.feedback_store import FeedbackStore, FeedbackSync
+
+
+def feedback(text:str, rating:int, day:int) -> dict:
+    return {'text':text, 'productValuation':rating, 'createdDate':f'2022-01-{day:02d}T10:00:00Z'}
+
+def crawl(store, imt_id:int, page:list, feedbacks_count:int, overlap:int=2) -> FeedbackSync:
+    """
+        Обход одного товара: синхронизация запрашивает одну страницу со skip = start и получает page
+    """
+
+    sync = FeedbackSync(store, imt_id, feedbacks_count, overlap=overlap)
+    sync.expect([sync.start])
+    sync.filter(sync.start, page[sync.start:])
+
+    return sync
+
+
+class FeedbackSyncCases:
+    """
+        Общие проверки синхронизации для хранилищ отзывов, store создает наследник
+    """
+
+    def setUp(self):
+        self.old = [feedback('первый', 5, 1), feedback('второй', 4, 2), feedback('третий', 3, 3)]
+        self.store.replace(1, [(row['text'], row['productValuation'], row['createdDate']) for row in self.old])
+
+    def test_incremental_append(self):
+        page = self.old + [feedback('четвертый', 5, 4)]
+        crawl(self.store, 1, page, len(page)).commit()
+
+        self.assertEqual(self.store.load(1)['text'], ['первый', 'второй', 'третий', 'четвертый'])
+        self.assertEqual(self.store.mark(1)['count'], 4)
+
+    def test_overlapping_syncs_do_not_duplicate(self):
+        # оба обхода начались до записи друг друга и скачали одни и те же новые отзывы
+        page = self.old + [feedback('четвертый', 5, 4), feedback('пятый', 1, 5)]
+        first = crawl(self.store, 1, page, len(page))
+        second = crawl(self.store, 1, page + [feedback('шестой', 2, 5)], len(page) + 1)
+
+        first.commit()
+        second.commit()
+
+        self.assertEqual(self.store.load(1)['text'], ['первый', 'второй', 'третий', 'четвертый', 'пятый', 'шестой'])
+        self.assertEqual(self.store.mark(1)['count'], 6)
+
+    def test_append_after_reset_is_dropped(self):
+        page = self.old + [feedback('четвертый', 5, 4)]
+        sync = crawl(self.store, 1, page, len(page))
+
+        self.store.reset(1)
+        sync.commit()
+
+        self.assertIsNone(self.store.mark(1))
+        self.assertEqual(self.store.load(1)['text'], [])
+
+
+class FeedbackSyncTest(FeedbackSyncCases, SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FeedbackStore(os.path.join(self.tmp.name, 'feedbacks.sqlite3'))
+        super().setUp()
+
+    def tearDown(self):
+        self.store._db.close()
+        self.tmp.cleanup()
+
+
+class DatabaseFeedbackSyncTest(FeedbackSyncCases, TestCase):
+
+    def setUp(self):
+        self.store = DatabaseFeedbackStore()
+        super().setUp()
+
+    def test_positions_are_unique(self):
+        page = self.old + [feedback('четвертый', 5, 4)]
+        first = crawl(self.store, 1, page, len(page))
+        second = crawl(self.store, 1, page, len(page))
+
+        first.commit()
+        second.commit()
+
+        self.assertEqual(list(Review.objects.filter(product__imt_id=1).order_by('position').values_list('position', flat=True)), [0, 1, 2, 3])
@@ -13,11 +13,6 @@ import os
 from pathlib import Path
 
 
-from navec import Navec
-from catboost import CatBoostClassifier
-import pymorphy2
-from nltk.stem.snowball import SnowballStemmer
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -161,12 +156,60 @@ COMMANDS = {
 
 COMMANDS_STRING = "\n".join([f"{item[0]} - {item[1]}" for item in COMMANDS.items()])
 
+# Настройки парсинга категорий
+# сколько запросов к Wildberries одновременно выполняет парсинг категории
+CATEGORY_CONCURRENCY = 16
+
+# сколько товаров категории собирать (страницы категории скачиваются, пока товаров не наберется столько)
+CATEGORY_MAX_PRODUCTS = 100
+
 # Настройки моделей машинного обучения
-embedding_model_path = './nn_models/navec_hudlit_v1_12B_500K_300d_100q.tar'
-EMB_MODEL = Navec.load(embedding_model_path)
+# сами модели загружаются лениво при первом обращении через nn_models.registry (или registry.warm_up() при старте бота)
+EMBEDDING_MODEL_PATH = './nn_models/navec_hudlit_v1_12B_500K_300d_100q.tar'
+
+# после manage.py convert_navec все процессы читают векторы через общий memory map
+EMB_STORE_PATH = './nn_models/navec_mmap'
+
+CLASSIFIER_PATH = './nn_models/wordnet_test_classifier'
+
+# сокет manage.py inference_server: если задан, эмбеддинги и классификатор держит только сервер,
+# а бот отправляет ему запросы (None - модели загружаются в каждый процесс)
+INFERENCE_SOCKET = None
+# ключ подключения к серверу инференса, общий для сервера и бота (запросы передаются через pickle, без ключа сервер их не читает)
+INFERENCE_AUTHKEY = SECRET_KEY.encode()
+INFERENCE_MAX_BATCH = 8192
+INFERENCE_MAX_DELAY = 0.005
+
+# кэш частей речи, общий для всех потоков анализа и сохраняемый между перезапусками бота
+MORPH_CACHE_SIZE = 200000
+MORPH_CACHE_PATH = './nn_models/morph_tags.pickle'
+
+# хранилище признаков биграм (индексы слов и вердикт классификатора), сбрасывается при смене моделей
+FEATURE_STORE_SIZE = 500000
+FEATURE_STORE_PATH = './nn_models/bigram_features.sqlite3'
+
+# количество процессов для предобработки отзывов (0 - в потоке анализа)
+ML_WORKERS = 0
+
+# зерно для выбора представителей кластеров (None - каждый отчет случаен)
+ML_RANDOM_STATE = None
+
+# размер порции отзывов для потокового анализа больших выборок
+ML_STREAM_CHUNK_SIZE = 10000
+
+# замер пика памяти по этапам анализа через tracemalloc (замедляет анализ)
+ML_PROFILE_MEMORY = False
+
+# представление эмбеддингов биграм: float32, float16 или int8 (меньше памяти на больших выборках, см. manage.py bench_embeddings).
+# float16 дает те же отчеты, что float32; int8 квантует с потерями - часть биграм меняет класс и кластер, отчеты могут отличаться
+ML_EMBEDDING_MODE = 'float32'
 
-CLASSIFIER = CatBoostClassifier()
-CLASSIFIER.load_model('./nn_models/wordnet_test_classifier')
+# результаты анализа одинаковых наборов отзывов выдаются из базы: время жизни в секундах и максимальное число записей
+RESULT_CACHE_TTL = 12 * 60 * 60
+RESULT_CACHE_MAX_ENTRIES = 1000
 
-STEMMER = SnowballStemmer("russian") 
-MORPH = pymorphy2.MorphAnalyzer()
\ No newline at end of file
+# отзывы товаров хранятся в базе (модели Product и Review) вместо parsing/feedbacks.sqlite3:
+# сколько отзывов записывается одним bulk_create и читается одной порцией
+FEEDBACK_STORE_DATABASE = True
+REVIEW_BULK_BATCH_SIZE = 2000
+REVIEW_READ_CHUNK_SIZE = 5000
@@ -1,165 +1,438 @@
 import pandas as pd
 import numpy as np
 
-import emoji
-import re
+import typing as tp
+from itertools import chain
 
 from catboost import CatBoostClassifier
 from navec import Navec
 
-from django.conf import settings
-
-from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.tokenize import word_tokenize
 import pymorphy2
 from nltk.stem.snowball import SnowballStemmer
-from sklearn.cluster import DBSCAN
+
+from nn_models.morph_cache import MorphTagCache
+from nn_models.embeddings import EmbeddingEngine, make_index
+from nn_models.matcher import AhoCorasick
+from nn_models.clustering import radius_clusters
+from nn_models.feature_store import BigramFeatureStore
+from nn_models.parallel import get_preprocess_pool
+from nn_models.mmap_navec import MmapNavec
+from nn_models.text import normalizer
+from nn_models.sampling import sample_groups
+from nn_models.profiling import StageProfiler
+from nn_models.registry import registry
+from nn_models.compact import EMBEDDING_MODES, CompactEmbeddings, concatenate_embeddings
 
 class CAN_ML:
     """
         Класс, реализующий ML обработку 
     """
     
-    def __init__(self, classifier:CatBoostClassifier, emb_model:Navec, stemmer:SnowballStemmer, morph:pymorphy2.MorphAnalyzer) -> None:
+    def __init__(self, classifier:CatBoostClassifier, emb_model:tp.Union[Navec, MmapNavec], stemmer:SnowballStemmer, morph:pymorphy2.MorphAnalyzer, tag_cache:MorphTagCache=None, feature_store:BigramFeatureStore=None, workers:int=0, random_state:int=None, job:str=None, profile_memory:bool=False, embedding_mode:str='float32') -> None:
         self.classifier = classifier
         self.emb_model = emb_model
         self.stemmer = stemmer
         self.morph = morph
+
+        # общий кэш частей речи, если не передан - заводим локальный на время работы
+        self.tag_cache = tag_cache if tag_cache is not None else MorphTagCache(morph)
+        self.embedder = EmbeddingEngine(make_index(emb_model))
+
+        # хранилище эмбеддингов и вердиктов уже встречавшихся биграм
+        self.feature_store = feature_store
+
+        # количество процессов для предобработки, 0 или 1 - в текущем потоке
+        self.workers = workers
+
+        # генератор для выбора представителей кластеров, с random_state результат воспроизводим
+        self.rng = np.random.default_rng(random_state)
+
+        # представление эмбеддингов биграм: float32 или компактные float16/int8, которые классификатор и кластеризация читают блоками
+        if embedding_mode not in EMBEDDING_MODES:
+            raise ValueError(f'Неизвестный режим эмбеддингов {embedding_mode}, доступны {EMBEDDING_MODES}')
+        self.embedding_mode = embedding_mode
+        self.embedding_chunk_size = 65536
+
+        # замеры этапов, новый профилировщик заводится на каждый запуск
+        self.job = job
+        self.profile_memory = profile_memory
+        self.profiler = StageProfiler(job, trace_memory=profile_memory)
         
         # константы
         self.pos_eps = 3.5
         self.neg_eps = 2.5
         self.banned_adj =  ['бесполезн', 'отличн', 'бомбов', 'бредов', 'важн', 'взрывн', 'возмутительн', 'гадк', 'гениальн', 'годн', 'друг', 'единствен', 'жалк', 'жив', 'забавн', 'идеальн', 'идентичн', 'изумительн', 'изящн', 'как', 'классн', 'крут', 'лев', 'люб', 'мил', 'модн', 'неверн', 'неплох', 'непохож', 'плох', 'хорош', 'прост', 'готов', 'серьезн', 'супер', 'классн', 'топ', 'бесподобн','очен', 'котор', 'довольн', 'довол']
  
+
+    @classmethod
+    def from_registry(cls, **kwargs) -> 'CAN_ML':
+        """
+            Метод создания обработчика на моделях и общих кэшах из реестра (загружаются при первом обращении)
+            @kwargs - остальные аргументы конструктора, переданные явно ресурсы заменяют ресурсы реестра
+        """
+
+        resources = {
+            'classifier':'CLASSIFIER',
+            'emb_model':'EMB_MODEL',
+            'stemmer':'STEMMER',
+            'morph':'MORPH',
+            'tag_cache':'MORPH_CACHE',
+            'feature_store':'FEATURE_STORE',
+        }
+
+        for argument, name in resources.items():
+            if argument not in kwargs:
+                kwargs[argument] = registry.get(name)
+
+        return cls(**kwargs)
         
     def run(self, data) -> dict:
         """
             Функция последовательного запуска алгоритма 
         """
         
-        # удаляем мусор из данных
-        data['review_clear'] = data['review'].apply(self.remove_garbage)
+        self.profiler = StageProfiler(self.job, trace_memory=self.profile_memory)
+
+        # удаляем мусор из данных и достаем биграммы из каждого отзыва
+        data['review_clear'], review_bigrams = self.preprocess(data['review'].values)
 
         # разделение на позитив и негатив
-        pos = sum([sent_tokenize(text) for text in list(data[data['rate'] > 3]['review_clear'].values)],[])
-        neg = sum([sent_tokenize(text) for text in list(data[data['rate'] <= 3]['review_clear'].values)],[])        
+        positive = (data['rate'] > 3).values
+        pos = list(chain.from_iterable(bigrams for bigrams, is_positive in zip(review_bigrams, positive) if is_positive))
+        neg = list(chain.from_iterable(bigrams for bigrams, is_positive in zip(review_bigrams, positive) if not is_positive))
         
-        # получение биграм
-        positive_bigrams = self.get_bigrams(pos)   
-        negative_bigrams = self.get_bigrams(neg)
-    
         # классификация
-        positive_bigrams['pred'] = self.classifier.predict(np.stack(positive_bigrams['bigrams_embs'].values))
-        negative_bigrams['pred'] = self.classifier.predict(np.stack(negative_bigrams['bigrams_embs'].values))
-
-        positive_classified = positive_bigrams[positive_bigrams['pred'] == 1].drop_duplicates(subset=['bigrams'])
-        negative_classified = negative_bigrams[negative_bigrams['pred'] == 1].drop_duplicates(subset=['bigrams'])
+        positive_classified, positive_embs = self.classify_bigrams(pos, 'positive')
+        negative_classified, negative_embs = self.classify_bigrams(neg, 'negative')
     
-        # кластеризация
-        positive_classified['cluster'] = DBSCAN(eps=3.5, min_samples=1).fit(np.stack(positive_classified['bigrams_embs'])).labels_
-        negative_classified['cluster'] = DBSCAN(eps=2.5, min_samples=1).fit(np.stack(negative_classified['bigrams_embs'])).labels_
-
-        positive_df = self.bigrams_clusterization(positive_classified)
-        negative_df = self.bigrams_clusterization(negative_classified)
-        
-        # фильтрация
-        positive_df['stemmed_adj'] = positive_df['bigrams'].apply(lambda x: self.stemmer.stem(x.split()[0]))
-        positive_df = positive_df[~positive_df['stemmed_adj'].isin(self.banned_adj)]
-
-        negative_df['stemmed_adj'] = negative_df['bigrams'].apply(lambda x: self.stemmer.stem(x.split()[0]))
-        negative_df = negative_df[~negative_df['stemmed_adj'].isin(self.banned_adj)]
-
-        positive = pd.DataFrame({})
-        for adj in positive_df['stemmed_adj'].unique():
-            positive_sample = positive_df[positive_df['stemmed_adj'] == adj].sample(n=1)
-            positive = pd.concat([positive, positive_sample])
-
-        negative = pd.DataFrame({})
-        for adj in negative_df['stemmed_adj'].unique():
-            negative_sample = negative_df[negative_df['stemmed_adj'] == adj].sample(n=1)
-            negative = pd.concat([negative, negative_sample])
+        # кластеризация и фильтрация
+        positive = self.select_bigrams(positive_classified, positive_embs, self.pos_eps, 'positive')
+        negative = self.select_bigrams(negative_classified, negative_embs, self.neg_eps, 'negative')
         
         # подготовка формата данных
-        return self.prepare_report_dict(positive['bigrams'].values, negative['bigrams'].values, data)
+        with self.profiler.stage('report', items=data.shape[0]):
+            report = self.prepare_report_dict(positive, negative, data)
+
+        self.finish_profiling(reviews=data.shape[0])
+        return report
+
+    def finish_profiling(self, **extra) -> dict:
+        """
+            Функция завершения замеров задачи: в отчет добавляется статистика кэшей
+        """
+
+        extra['tag_cache'] = {'hits':self.tag_cache.hits, 'misses':self.tag_cache.misses}
+        if self.feature_store is not None:
+            extra['feature_store'] = {'hits':self.feature_store.hits, 'misses':self.feature_store.misses}
+
+        return self.profiler.finish(**extra)
+
+    def run_stream(self, chunks:tp.Iterable[pd.DataFrame]) -> dict:
+        """
+            Функция потокового запуска алгоритма по порциям отзывов (колонки review, rate)
+            Для каждой порции сразу считаются биграммы, эмбеддинги и вердикты классификатора, в памяти остаются
+            только уникальные значимые биграммы и до 4 примеров на каждую, кластеризация - после последней порции.
+            Примеры ищутся среди биграм, известных к моменту обработки порции
+            @chunks:tp.Iterable[pd.DataFrame] - итератор порций отзывов
+        """
+
+        self.profiler = StageProfiler(self.job, trace_memory=self.profile_memory)
+
+        states = {
+            True:{'candidates':{}, 'embs':[], 'points':{}, 'matcher':None},
+            False:{'candidates':{}, 'embs':[], 'points':{}, 'matcher':None},
+        }
+        offset = 0
+
+        for chunk in chunks:
+            clean_texts, review_bigrams = self.preprocess(chunk['review'].values)
+            positive = (chunk['rate'] > 3).values
+
+            for is_positive, state in states.items():
+                polarity = 'positive' if is_positive else 'negative'
+                selected = np.flatnonzero(positive == is_positive)
+                normal_bigrams = list(chain.from_iterable(review_bigrams[i] for i in selected))
+
+                # новые значимые биграммы добавляются в кандидаты вместе с эмбеддингами
+                classified, embs = self.classify_bigrams(normal_bigrams, polarity)
+                new = [i for i, bigram in enumerate(classified['bigrams'].values) if bigram not in state['candidates']]
+
+                if new:
+                    for i in new:
+                        state['candidates'][classified['bigrams'].values[i]] = len(state['candidates'])
+                    state['embs'].append(embs[new])
+                    state['matcher'] = AhoCorasick(list(state['candidates']))
+
+                if state['matcher'] is not None:
+                    with self.profiler.stage('report', polarity, items=len(selected)):
+                        self.collect_stream_examples(state, chunk, clean_texts, selected, offset)
+
+            offset += chunk.shape[0]
+
+        points = []
+        for is_positive, state in states.items():
+            bigrams = list(state['candidates'])
+            classified = pd.DataFrame({'bigrams':pd.Series(bigrams, dtype=object)})
+            embs = concatenate_embeddings(state['embs'], self.embedder.dim, self.embedding_mode)
+
+            selected = self.select_bigrams(classified, embs, self.pos_eps if is_positive else self.neg_eps, 'positive' if is_positive else 'negative')
+
+            # порядок как в prepare_report_dict: по первому отзыву с примером, затем по порядку биграм
+            selected = [bigram for bigram in selected if state['candidates'][bigram] in state['points']]
+            order = sorted(range(len(selected)), key=lambda i: (state['points'][state['candidates'][selected[i]]]['first'], i))
+
+            result = {}
+            for i in order:
+                point = state['points'][state['candidates'][selected[i]]]
+                result[selected[i]] = {
+                    'examples':point['examples'],
+                    'rates':point['rates'],
+                    'mean_rate':round(np.mean(point['rates']), 1),
+                }
+            points.append(result)
+
+        self.finish_profiling(reviews=offset)
+
+        return {
+            'good_points':points[0],
+            'bad_points':points[1],
+        }
+
+    @staticmethod
+    def collect_stream_examples(state:dict, chunk:pd.DataFrame, clean_texts:list, selected:np.ndarray, offset:int, max_examples:int=4) -> None:
+        """
+            Функция пополнения примеров кандидатов по одной порции отзывов
+            @state:dict - состояние потоковой обработки одной тональности
+            @chunk:pd.DataFrame - порция отзывов
+            @clean_texts:list - очищенные тексты порции
+            @selected:np.ndarray - номера отзывов порции нужной тональности
+            @offset:int - номер первого отзыва порции во всем потоке
+            @max_examples:int - максимальное количество примеров на биграмму
+        """
+
+        points = state['points']
+        if len(points) == len(state['candidates']) and all(len(point['examples']) >= max_examples for point in points.values()):
+            return None
+
+        reviews, rates = chunk['review'].values, chunk['rate'].values
+
+        for i in selected:
+            for pattern_id in sorted(state['matcher'].find(clean_texts[i])):
+                point = points.get(pattern_id)
+
+                if point is None:
+                    points[pattern_id] = {'examples':[reviews[i]], 'rates':[rates[i]], 'first':offset + i}
+                elif len(point['examples']) < max_examples:
+                    point['examples'].append(reviews[i])
+                    point['rates'].append(rates[i])
+
+    def select_bigrams(self, classified:pd.DataFrame, embs:tp.Union[np.ndarray, CompactEmbeddings], eps:float, polarity:str=None) -> np.ndarray:
+        """
+            Функция выбора биграм для отчета: кластеризация, по одной биграмме на кластер,
+            фильтрация общих прилагательных и по одной биграмме на прилагательное
+            @classified:pd.DataFrame - уникальные значимые биграммы
+            @embs:np.ndarray - их эмбеддинги
+            @eps:float - радиус кластеризации
+            @polarity:str - тональность для профилировщика
+        """
+
+        with self.profiler.stage('clustering', polarity, items=embs.shape[0]):
+            classified = classified.assign(cluster=radius_clusters(embs, eps=eps))
+
+        with self.profiler.stage('selection', polarity, items=classified.shape[0]):
+            df = self.bigrams_clusterization(classified)
+
+            df = df.assign(stemmed_adj=[self.stemmer.stem(bigram.split()[0]) for bigram in df['bigrams'].values])
+            df = df[~df['stemmed_adj'].isin(self.banned_adj)]
+
+            return sample_groups(df, 'stemmed_adj', self.rng)['bigrams'].values
         
+    def preprocess(self, texts:list) -> tp.Tuple[list, list]:
+        """
+            Функция очистки отзывов и получения биграм каждого отзыва
+            При workers > 1 отзывы делятся между процессами пула, порядок результата сохраняется
+            @texts:list - тексты отзывов
+        """
+
+        if self.workers > 1:
+            with self.profiler.stage('preprocess', items=len(texts)):
+                return get_preprocess_pool(self.workers, self.tag_cache.maxsize, self.tag_cache.path).preprocess(texts)
+
+        with self.profiler.stage('cleaning', items=len(texts)):
+            clean_texts, sentences = normalizer.process(texts)
+
+        with self.profiler.stage('morph', items=len(texts)):
+            review_bigrams = [self.sentences_bigrams(review_sentences, self.tag_cache) for review_sentences in sentences]
+
+        return clean_texts, review_bigrams
+
+    def classify_bigrams(self, normal_bigrams:list, polarity:str=None) -> tp.Tuple[pd.DataFrame, tp.Union[np.ndarray, CompactEmbeddings]]:
+        """
+            Функция получения уникальных биграм, которые классификатор отметил как значимые
+            Возвращает таблицу биграм и матрицу их эмбеддингов в том же порядке
+            @normal_bigrams:list - список биграм всех отзывов
+            @polarity:str - тональность для профилировщика
+        """
+
+        with self.profiler.stage('bigrams', polarity, items=len(normal_bigrams)):
+            bigrams, uniques = self.bigrams_table(normal_bigrams)
+
+        embs, verdicts = self.bigram_features(uniques, polarity)
+        bigrams['pred'] = verdicts[bigrams['emb_idx'].values]
+
+        classified = bigrams[bigrams['pred'] == 1].drop_duplicates(subset=['bigrams'])
+
+        return classified, embs[classified['emb_idx'].values]
+
     def bigrams_clusterization(self, classified:pd.DataFrame) -> pd.DataFrame:
         """
-            Кластеризация биграмм
+            Кластеризация биграмм: по одной случайной биграмме из каждого кластера
         """
-        
-        df = pd.DataFrame({})
 
-        for cluster in classified['cluster'].unique():
-            sample = classified[classified['cluster'] == cluster].sample(n=1)
-            df = pd.concat([df, sample])
+        return sample_groups(classified, 'cluster', self.rng)
     
-        return df
-    
-    def get_bigrams(self, reviews:list) -> pd.DataFrame:
+    def bigram_features(self, bigrams:list, polarity:str=None) -> tp.Tuple[tp.Union[np.ndarray, CompactEmbeddings], np.ndarray]:
+        """
+            Функция получения матрицы эмбеддингов (float32 или компактной, по embedding_mode) и вердиктов классификатора для уникальных биграм
+            Признаки известных биграм берутся из хранилища, в классификатор попадают только новые.
+            Эмбеддинги считаются блоками по embedding_chunk_size строк: классификатор видит точные float32, в матрицу попадает сжатый блок
+            @bigrams:list - список уникальных биграм
+            @polarity:str - тональность для профилировщика
+        """
+
+        with self.profiler.stage('feature_store', polarity, items=len(bigrams)):
+            known = self.feature_store.lookup(bigrams) if self.feature_store is not None else {}
+            unseen = [bigram for bigram in bigrams if bigram not in known]
+
+        # индексы слов новых биграм: отдельный этап, чтобы каждая биграма попадала в items этапа embedding один раз
+        with self.profiler.stage('encoding', polarity, items=len(unseen)):
+            unseen_ids, unseen_counts = self.embedder.encode(unseen)
+            unseen_parts = iter(np.split(unseen_ids, np.cumsum(unseen_counts)[:-1])) if unseen else iter(())
+
+            parts = [known[bigram][0] if bigram in known else next(unseen_parts) for bigram in bigrams]
+            counts = np.fromiter((len(part) for part in parts), dtype=np.int64, count=len(parts))
+            ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+
+            verdicts = np.fromiter((known[bigram][1] if bigram in known else 0 for bigram in bigrams), dtype=np.int64, count=len(bigrams))
+            is_unseen = np.fromiter((bigram not in known for bigram in bigrams), dtype=bool, count=len(bigrams))
+
+            if self.embedding_mode == 'float32':
+                embs = np.empty((len(bigrams), self.embedder.dim), dtype=np.float32)
+            else:
+                embs = CompactEmbeddings.empty(len(bigrams), self.embedder.dim, self.embedding_mode)
+
+        for start in range(0, len(bigrams), self.embedding_chunk_size):
+            stop = min(len(bigrams), start + self.embedding_chunk_size)
+
+            with self.profiler.stage('embedding', polarity, items=stop - start):
+                dense = self.embedder.embed_encoded(ids[offsets[start]:offsets[stop]], counts[start:stop])
+                rows = np.flatnonzero(is_unseen[start:stop])
+
+            if len(rows):
+                with self.profiler.stage('classification', polarity, items=len(rows)):
+                    verdicts[rows + start] = np.asarray(self.classifier.predict(dense[rows])).reshape(-1)
+
+            embs[start:stop] = dense
+
+        if unseen and self.feature_store is not None:
+            self.feature_store.update({bigrams[i]: (parts[i], verdicts[i]) for i in np.flatnonzero(is_unseen)})
+
+        return embs, verdicts
+
+    def get_bigrams(self, reviews:list) -> tp.Tuple[pd.DataFrame, list]:
         """
             Функция получения биграм из отзывов
+            Возвращает таблицу биграм с номером уникальной биграммы (emb_idx) и список уникальных биграм
         """
         
-        bigrams = pd.DataFrame({'bigrams':[], 'bigrams_embs':[]})
-        
+        # копим биграммы в буфер, таблицу собираем один раз в конце
+        normal_bigrams = []
         for review in reviews:
-                normal_bigrams = self.get_normal_bigrams(review)
-                embeddings = list(map(lambda x: self.get_text_embedding(x), normal_bigrams))
-                bigrams = pd.concat([bigrams, pd.DataFrame({
-                    'bigrams':normal_bigrams,
-                    'bigrams_embs':embeddings
-                })])
-        
-        return bigrams
+            normal_bigrams.extend(self.get_normal_bigrams(review))
+
+        return self.bigrams_table(normal_bigrams)
+
+    @staticmethod
+    def bigrams_table(normal_bigrams:list) -> tp.Tuple[pd.DataFrame, list]:
+        """
+            Функция построения таблицы биграм с номером уникальной биграммы (emb_idx) и списка уникальных биграм
+            @normal_bigrams:list - список биграм
+        """
+
+        codes, uniques = pd.factorize(pd.Series(normal_bigrams, dtype=object))
+        bigrams = pd.DataFrame({
+            'bigrams':pd.Series(normal_bigrams, dtype=object),
+            'emb_idx':codes,
+        })
+
+        return bigrams, list(uniques)
     
     @staticmethod
     def prepare_report_dict(pos_bigrams:np.array, neg_bigrams:np.array, dataset:pd.DataFrame) -> dict:
         """
             Функция подготовки структуры данных для генерации отчета
+            Все биграммы ищутся одним автоматом Ахо-Корасик, каждый отзыв просматривается один раз
         """
         
-        pos_dict = {}
-        neg_dict = {}
-
-        pos_reviews = dataset[dataset['rate'] > 3].values
-        neg_reviews = dataset[dataset['rate'] <= 3].values
-
-        for review in pos_reviews:
-            for bigram in pos_bigrams:
-                if bigram in review[2]:
-                    if bigram not in pos_dict.keys():
-                        pos_dict[bigram] = {
-                            'examples':[review[0]],
-                            'rates':[review[1]]
-                        }
-                    else:
-                        if len(pos_dict[bigram]['examples']) < 4:
-                            pos_dict[bigram]['examples'] += [review[0]]
-                            pos_dict[bigram]['rates'] += [review[1]]
-
-        for key in pos_dict.keys():
-            pos_dict[key]['mean_rate'] = round(np.mean(pos_dict[key]['rates']), 1)
-
-
-        for review in neg_reviews:
-            for bigram in  neg_bigrams:
-                if bigram in review[2]:
-                    if bigram not in neg_dict.keys():
-                        neg_dict[bigram] = {
-                            'examples':[review[0]],
-                            'rates':[review[1]]
-                        }
-                    else:
-                        if len(neg_dict[bigram]['examples']) < 4:
-                            neg_dict[bigram]['examples'] += [review[0]]
-                            neg_dict[bigram]['rates'] += [review[1]]                 
-
-        for key in neg_dict.keys():
-            neg_dict[key]['mean_rate'] = round(np.mean(neg_dict[key]['rates']), 1)
+        pos_bigrams, neg_bigrams = list(pos_bigrams), list(neg_bigrams)
+        patterns = list(dict.fromkeys(pos_bigrams + neg_bigrams))
+        matcher = AhoCorasick(patterns)
+
+        positive = dataset['rate'] > 3
+        pos_dict = CAN_ML.collect_examples(matcher, pos_bigrams, dataset[positive])
+        neg_dict = CAN_ML.collect_examples(matcher, neg_bigrams, dataset[~positive])
 
         return {
             'good_points':pos_dict,
             'bad_points':neg_dict,
         }
+
+    @staticmethod
+    def collect_examples(matcher:AhoCorasick, bigrams:list, reviews:pd.DataFrame, max_examples:int=4) -> dict:
+        """
+            Функция сбора примеров отзывов и оценок для каждой биграммы
+            @matcher:AhoCorasick - автомат, построенный по всем биграммам задачи
+            @bigrams:list - биграммы, для которых нужны примеры
+            @reviews:pd.DataFrame - отзывы с колонками review, rate, review_clear
+            @max_examples:int - максимальное количество примеров на биграмму
+        """
+
+        # порядок биграм в исходном списке определяет порядок добавления в отчет внутри одного отзыва
+        order = {bigram: i for i, bigram in reversed(list(enumerate(bigrams)))}
+        wanted = {pattern_id: order[pattern] for pattern_id, pattern in enumerate(matcher.patterns) if pattern in order}
+
+        points = {}
+        remaining = len(order)
+
+        for review, rate, review_clear in zip(reviews['review'].values, reviews['rate'].values, reviews['review_clear'].values):
+            if not remaining:
+                break
+
+            matched = sorted(wanted[pattern_id] for pattern_id in matcher.find(review_clear) if pattern_id in wanted)
+
+            for i in matched:
+                bigram = bigrams[i]
+
+                if bigram not in points:
+                    points[bigram] = {
+                        'examples':[review],
+                        'rates':[rate]
+                    }
+                elif len(points[bigram]['examples']) < max_examples:
+                    points[bigram]['examples'] += [review]
+                    points[bigram]['rates'] += [rate]
+                else:
+                    continue
+
+                if len(points[bigram]['examples']) == max_examples:
+                    remaining -= 1
+
+        for key in points.keys():
+            points[key]['mean_rate'] = round(np.mean(points[key]['rates']), 1)
+
+        return points
     
     def get_normal_bigrams(self, text:str) -> list:
         """
@@ -168,10 +441,21 @@ class CAN_ML:
         """
 
         words = word_tokenize(text)
+
+        return self.pair_bigrams(words, self.tag_cache.get_many(words))
+
+    @staticmethod
+    def pair_bigrams(words:list, tags:list) -> list:
+        """
+            Метод получения биграм прилагательное + существительное из соседних токенов
+            @words:list - токены предложения
+            @tags:list - части речи токенов
+        """
+
         bigrams = []
 
         for i in range(len(words) - 1):
-            tag1, tag2 = str(self.morph.parse(words[i])[0].tag).split(',')[0], str(self.morph.parse(words[i + 1])[0].tag).split(',')[0]
+            tag1, tag2 = tags[i], tags[i + 1]
 
             if (tag2 in ['ADJF','ADJS'] and tag1 == 'NOUN'):
                 bigrams.append(words[i + 1] + ' ' + words[i])
@@ -180,32 +464,45 @@ class CAN_ML:
 
         return bigrams
     
+    @staticmethod
+    def preprocess_review(text:str, tag_cache:MorphTagCache) -> tp.Tuple[str, list]:
+        """
+            Метод очистки одного отзыва и получения его биграм
+            @text:str - текст отзыва
+            @tag_cache:MorphTagCache - кэш частей речи
+        """
+
+        clean_text = normalizer.clean(text)
+
+        return clean_text, CAN_ML.sentences_bigrams(normalizer.tokenize(clean_text), tag_cache)
+
+    @staticmethod
+    def sentences_bigrams(sentences:list, tag_cache:MorphTagCache) -> list:
+        """
+            Метод получения биграм отзыва по его предложениям, разбитым на токены
+            @sentences:list - список предложений (списков токенов)
+            @tag_cache:MorphTagCache - кэш частей речи
+        """
+
+        bigrams = []
+        for words in sentences:
+            bigrams.extend(CAN_ML.pair_bigrams(words, tag_cache.get_many(words)))
+
+        return bigrams
+
     @staticmethod
     def remove_garbage(text: str) -> str:
         """
             Метод, удаляющая весь мусор из текста
         """
         
-        allchars = [str for str in text]
-        emoji_list = [c for c in allchars if c in emoji.UNICODE_EMOJI]
-        clean_text = ' '.join([str for str in text.split() if not any(i in str for i in emoji_list)])
 
-        return re.sub(r'\d', ' ', re.sub(r'[^\w\s]',' ',clean_text.strip().lower()))
+        return normalizer.clean(text)
     
     @staticmethod
     def get_text_embedding(text:str) -> np.array:
         """
             Метод, возвращающий embedding текста
         """
-        words = text.split()
-        embeddings = []
-
-        for word in words:
-            try:
-                vector = settings.EMB_MODEL[word.lower()]
-            except:
-                vector = np.zeros(300)
-
-            embeddings.append(vector)
 
-        return np.array(embeddings).mean(axis=0)
\ No newline at end of file
+        return EmbeddingEngine(make_index(registry.get('EMB_MODEL'))).embed([text])[0]
\ No newline at end of file
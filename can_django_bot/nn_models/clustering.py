@@ -0,0 +1,91 @@
+import numpy as np
+
+from nn_models.compact import dense_rows
+
+# байт на элемент блока: расстояние float64, маска и до двух номеров int64 на ребро
+TILE_BYTES_PER_ITEM = 8 + 1 + 2 * 8
+
+
+def _flatten(parent:np.ndarray) -> np.ndarray:
+    """
+        Сжатие путей: каждая точка указывает прямо на корень своего дерева
+    """
+
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+
+        parent = grandparent
+
+def _union(parent:np.ndarray, a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    """
+        Объединение деревьев леса по ребрам (a, b): корень с большим номером подвешивается к меньшему,
+        поэтому циклов нет и корень компоненты - точка с минимальным номером
+        @parent:np.ndarray - лес, сжатый _flatten
+    """
+
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        crossing = root_a != root_b
+
+        if not crossing.any():
+            break
+
+        root_a, root_b = root_a[crossing], root_b[crossing]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        parent = _flatten(parent)
+
+        # ребра внутри одной компоненты больше не нужны
+        a, b = a[crossing], b[crossing]
+
+    return parent
+
+def radius_clusters(X, eps:float, working_memory:int=64) -> np.ndarray:
+    """
+        Кластеризация, эквивалентная DBSCAN(eps=eps, min_samples=1): кластер - компонента связности
+        графа, в котором точки соединены, если евклидово расстояние между ними <= eps.
+        Матрица расстояний считается блоками, ребра каждого блока сразу сливаются в лес компонент (union-find),
+        поэтому в памяти только лес (O(n)) и один блок (не больше working_memory)
+        @X - матрица эмбеддингов (n, dim): np.ndarray или CompactEmbeddings (распаковывается поблочно)
+        @eps:float - радиус соседства, как в DBSCAN
+        @working_memory:int - ограничение на память блока в мегабайтах
+    """
+
+    n = X.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # блок chunk_size x chunk_size вместе с маской и ребрами
+    chunk_size = max(1, int(np.sqrt(working_memory * 2 ** 20 / TILE_BYTES_PER_ITEM)))
+
+    norms = np.concatenate([
+        np.einsum('ij,ij->i', block, block, dtype=np.float64)
+        for block in (dense_rows(X, start, start + chunk_size) for start in range(0, n, chunk_size))
+    ])
+    eps2 = eps ** 2
+
+    parent = np.arange(n)
+
+    for start in range(0, n, chunk_size):
+        stop = min(n, start + chunk_size)
+        chunk = dense_rows(X, start, stop).astype(np.float64)
+
+        # только пары j >= i, граф неориентированный
+        for col_start in range(start, n, chunk_size):
+            col_stop = min(n, col_start + chunk_size)
+
+            dist = chunk @ dense_rows(X, col_start, col_stop).astype(np.float64).T
+            dist *= -2
+            dist += norms[start:stop, None]
+            dist += norms[None, col_start:col_stop]
+
+            block_rows, block_cols = np.nonzero(dist <= eps2)
+            del dist
+
+            parent = _union(parent, block_rows + start, block_cols + col_start)
+
+    # метки в порядке первого появления, как у DBSCAN
+    _, labels = np.unique(parent, return_inverse=True)
+
+    return labels.reshape(-1)
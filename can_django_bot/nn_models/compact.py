@@ -0,0 +1,110 @@
+import numpy as np
+import typing as tp
+
+
+EMBEDDING_MODES = ('float32', 'float16', 'int8')
+
+class CompactEmbeddings:
+    """
+        Компактная матрица эмбеддингов: float16 (в 2 раза меньше float32) или int8 с масштабом на строку (почти в 4 раза меньше).
+        Потребители (классификатор, кластеризация) читают ее блоками через dense, целиком в float32 она не распаковывается
+    """
+
+    def __init__(self, data:np.ndarray, scale:np.ndarray=None) -> None:
+        """
+            @data:np.ndarray - матрица float16 или int8 (n, dim)
+            @scale:np.ndarray - масштаб каждой строки float32 (только для int8)
+        """
+        self.data = data
+        self.scale = scale
+
+    @classmethod
+    def empty(cls, n:int, dim:int, mode:str) -> 'CompactEmbeddings':
+        """
+            Метод создания пустой матрицы, которую заполняют блоками через присваивание
+            @n:int - количество строк
+            @dim:int - размерность эмбеддинга
+            @mode:str - float16 или int8
+        """
+
+        if mode == 'float16':
+            return cls(np.empty((n, dim), dtype=np.float16))
+        if mode == 'int8':
+            return cls(np.empty((n, dim), dtype=np.int8), np.empty(n, dtype=np.float32))
+
+        raise ValueError(f'Неизвестный режим эмбеддингов {mode}, доступны {EMBEDDING_MODES[1:]}')
+
+    @property
+    def mode(self) -> str:
+        return 'int8' if self.scale is not None else 'float16'
+
+    @property
+    def shape(self) -> tp.Tuple[int, int]:
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, rows) -> 'CompactEmbeddings':
+        return CompactEmbeddings(self.data[rows], self.scale[rows] if self.scale is not None else None)
+
+    def __setitem__(self, rows, X:np.ndarray) -> None:
+        """
+            Метод записи строк float32 с квантованием
+        """
+
+        if self.scale is None:
+            self.data[rows] = X
+            return None
+
+        scale = np.abs(X).max(axis=1) / 127
+        scale[scale == 0] = 1
+
+        self.scale[rows] = scale
+        self.data[rows] = np.rint(X / scale[:, None])
+
+    def dense(self, start:int=0, stop:int=None) -> np.ndarray:
+        """
+            Метод распаковки строк [start, stop) в float32
+        """
+
+        data = self.data[start:stop].astype(np.float32)
+
+        if self.scale is not None:
+            data *= self.scale[start:stop, None]
+
+        return data
+
+def dense_rows(X, start:int=0, stop:int=None) -> np.ndarray:
+    """
+        Функция получения строк [start, stop) матрицы эмбеддингов в виде numpy массива
+        @X - np.ndarray или CompactEmbeddings
+    """
+
+    if isinstance(X, CompactEmbeddings):
+        return X.dense(start, stop)
+
+    return np.asarray(X[start:stop])
+
+def concatenate_embeddings(parts:list, dim:int, mode:str='float32'):
+    """
+        Функция склейки матриц эмбеддингов одного режима
+        @parts:list - матрицы np.ndarray или CompactEmbeddings
+        @dim:int - размерность (нужна, если частей нет)
+        @mode:str - режим эмбеддингов
+    """
+
+    if mode == 'float32':
+        return np.concatenate(parts) if parts else np.empty((0, dim), dtype=np.float32)
+
+    if not parts:
+        return CompactEmbeddings.empty(0, dim, mode)
+
+    return CompactEmbeddings(
+        np.concatenate([part.data for part in parts]),
+        np.concatenate([part.scale for part in parts]) if mode == 'int8' else None,
+    )
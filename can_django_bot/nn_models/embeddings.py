@@ -0,0 +1,130 @@
+import numpy as np
+import typing as tp
+
+from navec import Navec
+
+
+class NavecIndex:
+    """
+        Адаптер над Navec: пакетный перевод слов в индексы словаря и индексов в векторы
+    """
+
+    def __init__(self, emb_model:Navec) -> None:
+        self.emb_model = emb_model
+        self.word_ids = emb_model.vocab.word_ids
+        self.pq = emb_model.pq
+        self.dim = int(emb_model.pq.dim)
+
+    def ids(self, words:list) -> np.ndarray:
+        """
+            Метод получения индексов слов в словаре Navec (-1 - слова нет в словаре)
+            @words:list - список слов
+        """
+
+        get = self.word_ids.get
+        return np.fromiter((get(word, -1) for word in words), dtype=np.int64, count=len(words))
+
+    def vectors(self, ids:np.ndarray, out:np.ndarray=None) -> np.ndarray:
+        """
+            Метод распаковки векторов по индексам словаря одним обращением к PQ
+            @ids:np.ndarray - индексы слов (только существующие)
+            @out:np.ndarray - матрица (len(ids), dim), в которую нужно записать результат
+        """
+
+        parts = self.pq.codes[self.pq.qdims, self.pq.indexes[ids]]
+        parts = parts.reshape(len(ids), self.dim)
+
+        if out is None:
+            return parts.astype(np.float32, copy=False)
+
+        out[:] = parts
+        return out
+
+
+def make_index(emb_model):
+    """
+        Функция, возвращающая источник векторов для EmbeddingEngine: Navec оборачивается в NavecIndex,
+        объекты с методами ids и vectors (например MmapNavec) используются как есть
+        @emb_model - Navec или готовый источник векторов
+    """
+
+    if hasattr(emb_model, 'ids') and hasattr(emb_model, 'vectors'):
+        return emb_model
+
+    return NavecIndex(emb_model)
+
+class EmbeddingEngine:
+    """
+        Векторизованный расчет эмбеддингов текстов (средний вектор слов) сразу для всей задачи
+    """
+
+    def __init__(self, index) -> None:
+        """
+            @index - источник векторов с методами ids(words) и vectors(ids), например NavecIndex или MmapNavec
+        """
+        self.index = index
+        self.dim = index.dim
+
+    def encode(self, texts:list) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+            Метод перевода текстов в индексы слов словаря, каждое уникальное слово ищется один раз
+            Возвращает плоский массив индексов (-1 - слова нет в словаре) и количество слов в каждом тексте
+            @texts:list - список текстов (биграм)
+        """
+
+        vocabulary = {}
+        codes = []
+        counts = np.empty(len(texts), dtype=np.int64)
+
+        for i, text in enumerate(texts):
+            words = text.split()
+            counts[i] = len(words)
+            codes.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+
+        word_ids = self.index.ids([word.lower() for word in vocabulary])
+
+        return word_ids[np.asarray(codes, dtype=np.int64)], counts
+
+    def embed_encoded(self, ids:np.ndarray, counts:np.ndarray) -> np.ndarray:
+        """
+            Метод, возвращающий матрицу (len(counts), dim) float32 средних векторов слов каждого текста
+            @ids:np.ndarray - плоский массив индексов слов из encode
+            @counts:np.ndarray - количество слов в каждом тексте
+        """
+
+        out = np.zeros((len(counts), self.dim), dtype=np.float32)
+
+        if not len(counts) or not ids.size:
+            return out
+
+        # векторы уникальных слов собираются в одну матрицу, слова не из словаря - нулевые строки
+        unique_ids, codes = np.unique(ids, return_inverse=True)
+        codes = codes.reshape(-1)
+        words_matrix = np.zeros((len(unique_ids), self.dim), dtype=np.float32)
+
+        found = np.flatnonzero(unique_ids >= 0)
+        if found.size:
+            words_matrix[found] = self.index.vectors(unique_ids[found])
+
+        # биграммы - все тексты одной длины, складываем по позициям без промежуточной матрицы всех слов
+        width = counts[0]
+        if width > 0 and (counts == width).all():
+            for j in range(width):
+                out += words_matrix[codes[j::width]]
+            out /= width
+            return out
+
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        out[filled] = np.add.reduceat(words_matrix[codes], offsets[filled], axis=0)
+        out[filled] /= counts[filled, None]
+
+        return out
+
+    def embed(self, texts:list) -> np.ndarray:
+        """
+            Метод, возвращающий матрицу (len(texts), dim) float32 средних векторов слов каждого текста
+            @texts:list - список текстов (биграм)
+        """
+
+        return self.embed_encoded(*self.encode(texts))
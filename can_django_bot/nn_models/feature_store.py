@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import typing as tp
+from collections import OrderedDict
+
+import numpy as np
+
+
+def files_fingerprint(paths:list) -> str:
+    """
+        Функция, возвращающая отпечаток набора файлов моделей (путь, размер, время изменения)
+        @paths:list - пути к файлам
+    """
+
+    digest = hashlib.sha1()
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        except OSError:
+            digest.update(f'{os.path.abspath(path)}:missing;'.encode())
+
+    return digest.hexdigest()
+
+class BigramFeatureStore:
+    """
+        Хранилище признаков биграм: индексы слов в словаре эмбеддингов и вердикт классификатора.
+        LRU кэш в памяти поверх компактной sqlite базы на диске, сбрасывается при изменении файлов моделей
+    """
+
+    def __init__(self, path:str=None, model_files:list=(), maxsize:int=500000) -> None:
+        """
+            @path:str - файл sqlite базы (None - только память)
+            @model_files:list - файлы моделей, при изменении которых хранилище очищается
+            @maxsize:int - максимальное количество биграм в памяти
+        """
+        self.path = path
+        self.model_files = list(model_files)
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+
+        self._features = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = files_fingerprint(self.model_files)
+        self._db = None
+
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS features (bigram TEXT PRIMARY KEY, ids BLOB, verdict INTEGER)')
+            self._db.commit()
+
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != self._fingerprint:
+                self._reset()
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _reset(self) -> None:
+        """
+            Очистка памяти и диска, запоминаем отпечаток текущих моделей
+        """
+
+        self._features.clear()
+
+        if self._db is not None:
+            self._db.execute('DELETE FROM features')
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (self._fingerprint,))
+            self._db.commit()
+
+    def _check_models(self) -> None:
+        fingerprint = files_fingerprint(self.model_files)
+
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._reset()
+
+    def _remember(self, bigram:str, features:tuple) -> None:
+        self._features[bigram] = features
+        self._features.move_to_end(bigram)
+
+        while len(self._features) > self.maxsize:
+            self._features.popitem(last=False)
+
+    def lookup(self, bigrams:list) -> tp.Dict[str, tp.Tuple[np.ndarray, int]]:
+        """
+            Метод получения сохраненных признаков, возвращает словарь биграмма -> (индексы слов, вердикт)
+            @bigrams:list - список уникальных биграм
+        """
+
+        found = {}
+
+        with self._lock:
+            self._check_models()
+
+            missing = []
+            for bigram in bigrams:
+                features = self._features.get(bigram)
+
+                if features is None:
+                    missing.append(bigram)
+                else:
+                    self._features.move_to_end(bigram)
+                    found[bigram] = features
+
+            if self._db is not None:
+                # ограничение sqlite на количество параметров в запросе
+                for start in range(0, len(missing), 500):
+                    part = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f'SELECT bigram, ids, verdict FROM features WHERE bigram IN ({",".join("?" * len(part))})',
+                        part,
+                    ).fetchall()
+
+                    for bigram, ids, verdict in rows:
+                        features = (np.frombuffer(ids, dtype=np.int32).astype(np.int64), int(verdict))
+                        self._remember(bigram, features)
+                        found[bigram] = features
+
+            self.hits += len(found)
+            self.misses += len(bigrams) - len(found)
+
+        return found
+
+    def update(self, features:tp.Dict[str, tp.Tuple[np.ndarray, int]]) -> None:
+        """
+            Метод сохранения признаков новых биграм
+            @features:dict - словарь биграмма -> (индексы слов, вердикт)
+        """
+
+        with self._lock:
+            rows = []
+            for bigram, (ids, verdict) in features.items():
+                self._remember(bigram, (np.asarray(ids, dtype=np.int64), int(verdict)))
+                rows.append((bigram, np.asarray(ids, dtype=np.int32).tobytes(), int(verdict)))
+
+            if self._db is not None and rows:
+                self._db.executemany('INSERT OR REPLACE INTO features (bigram, ids, verdict) VALUES (?, ?, ?)', rows)
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,296 @@
+import logging
+import os
+import queue
+import threading
+import time
+import typing as tp
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from nn_models.embeddings import make_index
+
+
+class InferenceError(Exception):
+    """
+        Ошибка, возникшая на сервере инференса при обработке запроса
+    """
+
+class _Pending:
+    """
+        Запрос, ожидающий обработки в общей пачке
+    """
+
+    __slots__ = ('data', 'done', 'result', 'error')
+
+    def __init__(self, data:np.ndarray) -> None:
+        self.data = data
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """
+        Объединение запросов из разных задач в одну пачку: первый запрос ждет попутчиков не дольше max_delay,
+        пачка отправляется раньше, если набралось max_batch строк
+    """
+
+    def __init__(self, function:tp.Callable[[np.ndarray], tp.Any], max_batch:int=8192, max_delay:float=0.005) -> None:
+        """
+            @function - функция над матрицей (или массивом) строк, возвращающая по результату на строку
+            @max_batch:int - максимальное количество строк в пачке
+            @max_delay:float - сколько секунд первый запрос пачки может ждать остальные
+        """
+        self.function = function
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, data:np.ndarray) -> np.ndarray:
+        """
+            Метод обработки строк в общей пачке, блокирует вызывающий поток до получения результата
+            @data:np.ndarray - строки запроса
+        """
+
+        pending = _Pending(data)
+        self.queue.put(pending)
+        pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+
+        return pending.result
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            rows = len(batch[0].data)
+            deadline = time.monotonic() + self.max_delay
+
+            while rows < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+
+                try:
+                    pending = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                batch.append(pending)
+                rows += len(pending.data)
+
+            try:
+                result = np.asarray(self.function(np.concatenate([pending.data for pending in batch])))
+
+                offset = 0
+                for pending in batch:
+                    pending.result = result[offset:offset + len(pending.data)]
+                    offset += len(pending.data)
+            except Exception as e:
+                logging.error(f'{e} возникла при обработке пачки из {len(batch)} запросов')
+                for pending in batch:
+                    pending.error = e
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += rows
+
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self) -> dict:
+        return {'batches':self.batches, 'requests':self.requests, 'rows':self.rows}
+
+class InferenceServer:
+    """
+        Локальный сервер инференса: единственный процесс, который держит эмбеддинги и классификатор.
+        Бот и веб сервер обращаются к нему через unix сокет, запросы векторов и классификации
+        от одновременно работающих задач склеиваются в общие пачки
+    """
+
+    def __init__(self, emb_model, classifier, path:str, authkey:bytes, max_batch:int=8192, max_delay:float=0.005) -> None:
+        """
+            @emb_model - Navec или MmapNavec
+            @classifier - классификатор с методом predict (CatBoostClassifier)
+            @path:str - путь к unix сокету
+            @authkey:bytes - общий с клиентами ключ: подключение без него отклоняется до приема запросов (они передаются через pickle)
+            @max_batch:int - максимальное количество строк в пачке
+            @max_delay:float - сколько секунд запрос может ждать попутчиков
+        """
+        self.index = make_index(emb_model)
+        self.path = path
+        self.authkey = authkey
+
+        self.vectors = MicroBatcher(self.index.vectors, max_batch=max_batch, max_delay=max_delay)
+        self.predictor = MicroBatcher(classifier.predict, max_batch=max_batch, max_delay=max_delay)
+
+        self.listener = None
+
+    def handle(self, operation:str, args:tuple) -> tp.Any:
+        """
+            Метод выполнения одного запроса клиента
+            @operation:str - название операции
+            @args:tuple - аргументы операции
+        """
+
+        if operation == 'ids':
+            return self.index.ids(*args)
+        if operation == 'vectors':
+            return self.vectors.submit(*args)
+        if operation == 'predict':
+            return self.predictor.submit(*args)
+        if operation == 'dim':
+            return self.index.dim
+        if operation == 'stats':
+            return {'vectors':self.vectors.stats(), 'predict':self.predictor.stats()}
+
+        raise ValueError(f'Неизвестная операция {operation}')
+
+    def serve_connection(self, connection) -> None:
+        with connection:
+            while True:
+                try:
+                    operation, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    response = ('ok', self.handle(operation, args))
+                except Exception as e:
+                    response = ('error', f'{type(e).__name__}: {e}')
+
+                try:
+                    connection.send(response)
+                except OSError:
+                    return
+
+    def serve_forever(self) -> None:
+        """
+            Метод приема клиентов, каждое подключение обслуживается в своем потоке
+        """
+
+        # сокет мог остаться от прошлого запуска
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        # сокет сразу создается доступным только владельцу, без промежутка до chmod
+        umask = os.umask(0o077)
+        try:
+            self.listener = Listener(self.path, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask)
+
+        logging.warning(f'Сервер инференса слушает {self.path}')
+
+        try:
+            while True:
+                try:
+                    connection = self.listener.accept()
+                except AuthenticationError as e:
+                    logging.error(f'{e} возникла во время подключения к серверу инференса, подключение отклонено')
+                    continue
+                except OSError:
+                    if self.listener is None:
+                        return
+                    raise
+
+                threading.Thread(target=self.serve_connection, args=(connection,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        listener, self.listener = self.listener, None
+
+        if listener is not None:
+            listener.close()
+
+class InferenceClient:
+    """
+        Клиент сервера инференса, заменяет в CAN_ML и источник векторов (ids, vectors, dim), и классификатор (predict).
+        У каждого потока свое подключение, поэтому запросы разных задач идут на сервер параллельно и попадают в общие пачки
+    """
+
+    def __init__(self, path:str, authkey:bytes) -> None:
+        """
+            @path:str - путь к unix сокету сервера
+            @authkey:bytes - ключ сервера (INFERENCE_AUTHKEY)
+        """
+        self.path = path
+        self.authkey = authkey
+        self.local = threading.local()
+        self._dim = None
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+
+        if connection is None:
+            connection = self.local.connection = Client(self.path, family='AF_UNIX', authkey=self.authkey)
+
+        return connection
+
+    def call(self, operation:str, *args) -> tp.Any:
+        """
+            Метод выполнения запроса на сервере, при обрыве соединения (перезапуск сервера) подключается заново один раз
+            @operation:str - название операции
+            @args - аргументы операции
+        """
+
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                connection.send((operation, args))
+                status, result = connection.recv()
+                break
+            except (EOFError, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+        if status == 'error':
+            raise InferenceError(result)
+
+        return result
+
+    def close(self) -> None:
+        connection = getattr(self.local, 'connection', None)
+        self.local.connection = None
+
+        if connection is not None:
+            connection.close()
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = self.call('dim')
+
+        return self._dim
+
+    def ids(self, words:list) -> np.ndarray:
+        return self.call('ids', list(words))
+
+    def vectors(self, ids:np.ndarray, out:np.ndarray=None) -> np.ndarray:
+        if len(ids) == 0:
+            vectors = np.empty((0, self.dim), dtype=np.float32)
+        else:
+            vectors = self.call('vectors', np.asarray(ids))
+
+        if out is None:
+            return vectors
+
+        out[:] = vectors
+        return out
+
+    def predict(self, X:np.ndarray) -> np.ndarray:
+        if len(X) == 0:
+            return np.empty(0)
+
+        return self.call('predict', np.ascontiguousarray(X))
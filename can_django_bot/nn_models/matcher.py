@@ -0,0 +1,81 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """
+        Автомат Ахо-Корасик для поиска всех вхождений набора подстрок за один проход по тексту
+    """
+
+    def __init__(self, patterns:list) -> None:
+        """
+            @patterns:list - список подстрок, номер подстроки в списке - ее идентификатор
+        """
+        self.patterns = list(patterns)
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            self._add(pattern, pattern_id)
+
+        self._build()
+
+    def _add(self, pattern:str, pattern_id:int) -> None:
+        state = 0
+
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+
+            state = next_state
+
+        self._out[state].append(pattern_id)
+
+    def _build(self) -> None:
+        """
+            Расчет суффиксных ссылок обходом в ширину, выходы наследуются по суффиксным ссылкам
+        """
+
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail if fail != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, text:str) -> set:
+        """
+            Метод, возвращающий множество идентификаторов подстрок, встречающихся в тексте
+            @text:str - текст
+        """
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(char, 0)
+
+            if out[state]:
+                found.update(out[state])
+
+        return found
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+
+from navec import Navec
+
+
+def convert_navec(emb_model:Navec, path:str) -> None:
+    """
+        Функция однократной конвертации Navec в каталог .npy файлов для чтения через memory map
+        @emb_model:Navec - загруженная модель Navec
+        @path:str - каталог, в который будет записано хранилище
+    """
+
+    os.makedirs(path, exist_ok=True)
+
+    # слова храним отсортированными байтовыми строками фиксированной ширины - поиск через searchsorted
+    words = np.array([word.encode('utf8') for word in emb_model.vocab.words])
+    order = np.argsort(words, kind='stable')
+
+    pq = emb_model.pq
+    np.save(os.path.join(path, 'words.npy'), words[order])
+    np.save(os.path.join(path, 'word_ids.npy'), order.astype(np.int32))
+    np.save(os.path.join(path, 'indexes.npy'), np.ascontiguousarray(pq.indexes, dtype=np.uint8))
+    np.save(os.path.join(path, 'codes.npy'), np.ascontiguousarray(pq.codes, dtype=np.float32))
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({
+            'vectors': int(pq.vectors),
+            'dim': int(pq.dim),
+            'qdim': int(pq.qdim),
+            'centroids': int(pq.centroids),
+        }, f)
+
+class MmapNavec:
+    """
+        Хранилище Navec только для чтения поверх memory map: все процессы делят одни страницы page cache,
+        загрузки модели в каждый процесс нет
+    """
+
+    def __init__(self, path:str) -> None:
+        """
+            @path:str - каталог, созданный convert_navec
+        """
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        self.dim = meta['dim']
+        self.qdim = meta['qdim']
+        self.qdims = np.arange(self.qdim)
+
+        self.words = np.load(os.path.join(path, 'words.npy'), mmap_mode='r')
+        self.word_ids = np.load(os.path.join(path, 'word_ids.npy'), mmap_mode='r')
+        self.indexes = np.load(os.path.join(path, 'indexes.npy'), mmap_mode='r')
+        self.codes = np.load(os.path.join(path, 'codes.npy'), mmap_mode='r')
+
+    @staticmethod
+    def exists(path:str) -> bool:
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    def ids(self, words:list) -> np.ndarray:
+        """
+            Метод получения индексов слов в словаре Navec (-1 - слова нет в словаре)
+            @words:list - список слов
+        """
+
+        if not len(words):
+            return np.empty(0, dtype=np.int64)
+
+        encoded = [word.encode('utf8') for word in words]
+        width = self.words.dtype.itemsize
+
+        # запросы приводим к ширине словаря, чтобы searchsorted не копировал весь словарь в другой тип
+        queries = np.array(encoded, dtype=self.words.dtype)
+        fits = np.fromiter((len(word) <= width for word in encoded), dtype=bool, count=len(encoded))
+
+        positions = np.searchsorted(self.words, queries)
+        positions = np.minimum(positions, len(self.words) - 1)
+
+        found = (self.words[positions] == queries) & fits
+        return np.where(found, self.word_ids[positions], -1).astype(np.int64)
+
+    def vectors(self, ids:np.ndarray, out:np.ndarray=None) -> np.ndarray:
+        """
+            Метод распаковки векторов по индексам словаря
+            @ids:np.ndarray - индексы слов (только существующие)
+            @out:np.ndarray - матрица (len(ids), dim), в которую нужно записать результат
+        """
+
+        parts = self.codes[self.qdims, self.indexes[ids]]
+        parts = parts.reshape(len(ids), self.dim)
+
+        if out is None:
+            return parts.astype(np.float32, copy=False)
+
+        out[:] = parts
+        return out
+
+    def __contains__(self, word:str) -> bool:
+        return self.ids([word])[0] >= 0
+
+    def __getitem__(self, word:str) -> np.ndarray:
+        """
+            Совместимость с Navec: вектор слова или KeyError
+        """
+
+        word_id = self.ids([word])[0]
+        if word_id < 0:
+            raise KeyError(word)
+
+        return self.vectors(np.array([word_id]))[0]
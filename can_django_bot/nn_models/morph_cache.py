@@ -0,0 +1,118 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pymorphy2
+
+
+class MorphTagCache:
+    """
+        Потокобезопасный LRU кэш частей речи: токен -> POS тег pymorphy2.
+        Один экземпляр разделяется всеми потоками анализа, может сохраняться на диск между перезапусками бота
+    """
+
+    def __init__(self, morph:pymorphy2.MorphAnalyzer, maxsize:int=200000, path:str=None) -> None:
+        """
+            @morph:pymorphy2.MorphAnalyzer - морфологический анализатор
+            @maxsize:int - максимальное количество токенов в кэше
+            @path:str - файл, в котором кэш хранится между перезапусками (None - только в памяти)
+        """
+        self.morph = morph
+        self.maxsize = maxsize
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+
+        self._tags = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def get(self, word:str) -> str:
+        """
+            Метод получения части речи токена
+            @word:str - токен
+        """
+
+        with self._lock:
+            tag = self._tags.get(word)
+
+            if tag is not None:
+                self._tags.move_to_end(word)
+                self.hits += 1
+                return tag
+
+            self.misses += 1
+
+        # разбор делаем вне блокировки, чтобы не тормозить остальные потоки
+        tag = str(self.morph.parse(word)[0].tag).split(',')[0]
+
+        with self._lock:
+            self._tags[word] = tag
+            self._tags.move_to_end(word)
+
+            while len(self._tags) > self.maxsize:
+                self._tags.popitem(last=False)
+
+        return tag
+
+    def get_many(self, words:list) -> list:
+        """
+            Метод получения частей речи для списка токенов
+            @words:list - список токенов
+        """
+
+        return [self.get(word) for word in words]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tags.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path:str=None) -> None:
+        """
+            Метод сохранения кэша на диск (атомарно, через временный файл)
+            @path:str - путь к файлу, по умолчанию self.path
+        """
+
+        path = path or self.path
+        if path is None:
+            return None
+
+        with self._lock:
+            items = list(self._tags.items())
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, path)
+
+    def load(self, path:str=None) -> None:
+        """
+            Метод загрузки кэша с диска, битый файл просто игнорируется
+            @path:str - путь к файлу, по умолчанию self.path
+        """
+
+        path = path or self.path
+
+        try:
+            with open(path, 'rb') as f:
+                items = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        with self._lock:
+            for word, tag in items[-self.maxsize:]:
+                self._tags[word] = tag
+                self._tags.move_to_end(word)
+
+            while len(self._tags) > self.maxsize:
+                self._tags.popitem(last=False)
@@ -0,0 +1,112 @@
+import multiprocessing
+import threading
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+
+# ресурсы процесса-воркера, создаются один раз при запуске процесса
+_worker_tag_cache = None
+
+def _init_worker(cache_size:int, cache_path:str) -> None:
+    """
+        Инициализация процесса пула: загрузка pymorphy2 и прогрев нормализатора текста и кэша частей речи
+        @cache_size:int - размер кэша частей речи воркера
+        @cache_path:str - файл общего кэша частей речи (читается, но не перезаписывается воркером)
+    """
+    global _worker_tag_cache
+
+    import pymorphy2
+    from nn_models.ML import CAN_ML
+    from nn_models.morph_cache import MorphTagCache
+
+    _worker_tag_cache = MorphTagCache(pymorphy2.MorphAnalyzer(), maxsize=cache_size)
+    if cache_path is not None:
+        _worker_tag_cache.load(cache_path)
+
+    # тот же путь, что и у _preprocess_shard: регулярки нормализатора и первые разборы pymorphy2
+    CAN_ML.preprocess_review('прогрев нормализатора отзывов', _worker_tag_cache)
+
+def _preprocess_shard(texts:list) -> tp.Tuple[list, list]:
+    """
+        Обработка части отзывов в процессе пула
+        @texts:list - тексты отзывов
+    """
+    from nn_models.ML import CAN_ML
+
+    clean_texts, review_bigrams = [], []
+    for text in texts:
+        clean_text, bigrams = CAN_ML.preprocess_review(text, _worker_tag_cache)
+        clean_texts.append(clean_text)
+        review_bigrams.append(bigrams)
+
+    return clean_texts, review_bigrams
+
+class PreprocessPool:
+    """
+        Пул процессов для очистки отзывов и получения биграм, живет между задачами
+    """
+
+    def __init__(self, workers:int, cache_size:int=200000, cache_path:str=None, shard_size:int=500) -> None:
+        """
+            @workers:int - количество процессов
+            @cache_size:int - размер кэша частей речи в каждом процессе
+            @cache_path:str - файл общего кэша частей речи для прогрева воркеров
+            @shard_size:int - количество отзывов в одной порции задачи
+        """
+        self.workers = workers
+        self.shard_size = shard_size
+
+        # spawn - процессы бота и веба многопоточные, fork в них небезопасен
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(cache_size, cache_path),
+        )
+
+    def preprocess(self, texts:list) -> tp.Tuple[list, list]:
+        """
+            Метод параллельной обработки отзывов, результаты склеиваются в исходном порядке
+            @texts:list - тексты отзывов
+        """
+
+        texts = list(texts)
+        shards = [texts[start:start + self.shard_size] for start in range(0, len(texts), self.shard_size)]
+
+        clean_texts, review_bigrams = [], []
+        for shard_clean_texts, shard_bigrams in self.executor.map(_preprocess_shard, shards):
+            clean_texts.extend(shard_clean_texts)
+            review_bigrams.extend(shard_bigrams)
+
+        return clean_texts, review_bigrams
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_preprocess_pool(workers:int, cache_size:int=200000, cache_path:str=None) -> PreprocessPool:
+    """
+        Функция, возвращающая общий для всех задач пул процессов (создается при первом обращении)
+        @workers:int - количество процессов
+        @cache_size:int - размер кэша частей речи в каждом процессе
+        @cache_path:str - файл общего кэша частей речи
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None or _pool.workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = PreprocessPool(workers, cache_size=cache_size, cache_path=cache_path)
+
+        return _pool
+
+def shutdown_preprocess_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
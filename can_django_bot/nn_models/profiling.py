@@ -0,0 +1,137 @@
+import json
+import logging
+import resource
+import threading
+import time
+import tracemalloc
+import typing as tp
+import uuid
+from contextlib import contextmanager
+
+# функции, которые получают отчет о каждой задаче: callback(report:dict)
+_callbacks = []
+_callbacks_lock = threading.Lock()
+
+# tracemalloc общий для всего процесса: этапы с замером памяти разных задач (потоков run_async) выполняются
+# по одному, иначе один этап сбрасывает пик или останавливает трассировку другого
+_tracing_lock = threading.Lock()
+
+def register_profile_callback(callback:tp.Callable[[dict], None]) -> None:
+    """
+        Функция подписки на отчеты профилировщика
+        @callback - функция, принимающая словарь отчета задачи
+    """
+
+    with _callbacks_lock:
+        if callback not in _callbacks:
+            _callbacks.append(callback)
+
+def unregister_profile_callback(callback:tp.Callable[[dict], None]) -> None:
+    with _callbacks_lock:
+        if callback in _callbacks:
+            _callbacks.remove(callback)
+
+class StageProfiler:
+    """
+        Профилировщик этапов одной задачи анализа: время, процессорное время потока, пик памяти, количество элементов.
+        cpu - time.thread_time потока задачи, работа процессов пула предобработки и сервера инференса в него не входит.
+        process_max_rss_kb - максимальный RSS процесса с его запуска (ru_maxrss), а не пик этапа.
+        peak_memory (при trace_memory) - пик памяти python за время этапа по tracemalloc, учитывает выделения всех потоков
+    """
+
+    def __init__(self, job:str=None, trace_memory:bool=False) -> None:
+        """
+            @job:str - название задачи для лога
+            @trace_memory:bool - считать пик памяти этапа через tracemalloc (заметно замедляет работу)
+        """
+        self.job = job or uuid.uuid4().hex
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name:str, polarity:str=None, items:int=None):
+        """
+            Контекстный менеджер замера этапа, количество элементов можно указать внутри через record['items']
+            @name:str - название этапа
+            @polarity:str - тональность (positive/negative), если этап выполняется для каждой
+            @items:int - количество обрабатываемых элементов
+        """
+
+        record = {'stage':name, 'polarity':polarity, 'items':items}
+
+        tracing = False
+        if self.trace_memory:
+            _tracing_lock.acquire()
+
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+
+        wall, cpu = time.perf_counter(), time.thread_time()
+
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.thread_time() - cpu
+            record['process_max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            if self.trace_memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+
+                _tracing_lock.release()
+
+            self.stages.append(record)
+
+    def summary(self) -> list:
+        """
+            Метод суммирования замеров по этапу и тональности (потоковый режим повторяет этапы для каждой порции)
+        """
+
+        summary = {}
+
+        for record in self.stages:
+            key = (record['stage'], record['polarity'])
+            total = summary.setdefault(key, {'stage':record['stage'], 'polarity':record['polarity'], 'calls':0, 'items':0, 'wall':0.0, 'cpu':0.0})
+
+            total['calls'] += 1
+            total['items'] += record['items'] or 0
+            total['wall'] += record['wall']
+            total['cpu'] += record['cpu']
+            total['process_max_rss_kb'] = record['process_max_rss_kb']
+
+            if 'peak_memory' in record:
+                total['peak_memory'] = max(total.get('peak_memory', 0), record['peak_memory'])
+
+        return list(summary.values())
+
+    def finish(self, **extra) -> dict:
+        """
+            Метод завершения задачи: одна структурированная строка в лог и отчет всем подписчикам
+            @extra - дополнительные поля отчета
+        """
+
+        report = {
+            'job':self.job,
+            'wall':time.perf_counter() - self.started,
+            'stages':self.summary(),
+            **extra,
+        }
+
+        logging.warning(f'ml_profile {json.dumps(report, ensure_ascii=False, default=str)}')
+
+        with _callbacks_lock:
+            callbacks = list(_callbacks)
+
+        for callback in callbacks:
+            try:
+                callback(report)
+            except Exception as e:
+                logging.error(f'{e} возникла в подписчике профилировщика')
+
+        return report
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+import typing as tp
+
+
+class ModelRegistry:
+    """
+        Реестр тяжелых ресурсов анализа (эмбеддинги, классификатор, морфология): каждый ресурс
+        загружается при первом обращении, ровно один раз на процесс, даже если к нему одновременно обращаются несколько потоков
+    """
+
+    def __init__(self) -> None:
+        self._loaders = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name:str, loader:tp.Callable[[], tp.Any]) -> None:
+        """
+            Метод регистрации ресурса, сам ресурс не загружается
+            @name:str - имя ресурса
+            @loader - функция без аргументов, возвращающая загруженный ресурс
+        """
+
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+
+    def get(self, name:str) -> tp.Any:
+        """
+            Метод получения ресурса, при первом обращении ресурс загружается
+            @name:str - имя ресурса
+        """
+
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f'Ресурс {name} не зарегистрирован')
+            lock = self._locks[name]
+
+        # загрузка под отдельной блокировкой ресурса: загрузчик может обращаться к другим ресурсам реестра
+        with lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._loaders[name]()
+                logging.warning(f'Ресурс {name} загружен за {time.perf_counter() - start:.2f}s')
+
+        return self._instances[name]
+
+    def loaded(self, name:str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, *names:str) -> None:
+        """
+            Метод предварительной загрузки ресурсов (по умолчанию всех), чтобы первый запрос пользователя не ждал загрузки
+            @names:str - имена ресурсов
+        """
+
+        for name in names or list(self._loaders):
+            self.get(name)
+
+
+def load_local_emb_model():
+    """
+        Загрузка эмбеддингов в текущий процесс (используется сервером инференса и режимом без сервера)
+    """
+    from django.conf import settings
+    from navec import Navec
+    from nn_models.mmap_navec import MmapNavec
+
+    # после manage.py convert_navec все процессы читают векторы через общий memory map
+    if MmapNavec.exists(settings.EMB_STORE_PATH):
+        return MmapNavec(settings.EMB_STORE_PATH)
+
+    return Navec.load(settings.EMBEDDING_MODEL_PATH)
+
+def load_local_classifier():
+    from django.conf import settings
+    from catboost import CatBoostClassifier
+
+    classifier = CatBoostClassifier()
+    classifier.load_model(settings.CLASSIFIER_PATH)
+
+    return classifier
+
+def _load_inference_client():
+    from django.conf import settings
+    from nn_models.inference import InferenceClient
+
+    if not settings.INFERENCE_SOCKET:
+        return None
+
+    return InferenceClient(settings.INFERENCE_SOCKET, settings.INFERENCE_AUTHKEY)
+
+def _load_emb_model():
+    from django.conf import settings
+
+    # при запущенном manage.py inference_server модели держит только он
+    if settings.INFERENCE_SOCKET:
+        return registry.get('INFERENCE')
+
+    return load_local_emb_model()
+
+def _load_classifier():
+    from django.conf import settings
+
+    if settings.INFERENCE_SOCKET:
+        return registry.get('INFERENCE')
+
+    return load_local_classifier()
+
+def _load_stemmer():
+    from nltk.stem.snowball import SnowballStemmer
+
+    return SnowballStemmer("russian")
+
+def _load_morph():
+    import pymorphy2
+
+    return pymorphy2.MorphAnalyzer()
+
+def _load_morph_cache():
+    from django.conf import settings
+    from nn_models.morph_cache import MorphTagCache
+
+    return MorphTagCache(registry.get('MORPH'), maxsize=settings.MORPH_CACHE_SIZE, path=settings.MORPH_CACHE_PATH)
+
+def _load_feature_store():
+    from django.conf import settings
+    from nn_models.feature_store import BigramFeatureStore
+
+    return BigramFeatureStore(
+        settings.FEATURE_STORE_PATH,
+        model_files=[settings.EMBEDDING_MODEL_PATH, settings.CLASSIFIER_PATH],
+        maxsize=settings.FEATURE_STORE_SIZE,
+    )
+
+
+registry = ModelRegistry()
+registry.register('INFERENCE', _load_inference_client)
+registry.register('EMB_MODEL', _load_emb_model)
+registry.register('CLASSIFIER', _load_classifier)
+registry.register('STEMMER', _load_stemmer)
+registry.register('MORPH', _load_morph)
+registry.register('MORPH_CACHE', _load_morph_cache)
+registry.register('FEATURE_STORE', _load_feature_store)
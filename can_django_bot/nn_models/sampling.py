@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+
+def sample_groups(df:pd.DataFrame, column:str, rng:np.random.Generator) -> pd.DataFrame:
+    """
+        Функция выбора одной случайной строки из каждой группы за один проход по таблице
+        Группы идут в порядке первого появления, результат воспроизводим при одинаковом состоянии rng
+        @df:pd.DataFrame - таблица
+        @column:str - колонка, по значениям которой строки делятся на группы
+        @rng:np.random.Generator - генератор случайных чисел
+    """
+
+    codes, _ = pd.factorize(df[column])
+
+    # в случайной перестановке первая встреченная строка группы и есть ее представитель
+    order = rng.permutation(len(df))
+    shuffled_codes = codes[order]
+    groups, first = np.unique(shuffled_codes, return_index=True)
+
+    rows = order[first[groups >= 0]]
+    return df.iloc[rows]
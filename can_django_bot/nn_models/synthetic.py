@@ -0,0 +1,130 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+# распределение оценок, близкое к отзывам на Wildberries
+RATING_WEIGHTS = {5:0.68, 4:0.12, 3:0.06, 2:0.04, 1:0.10}
+
+# прилагательные в мужском, женском, среднем роде и множественном числе
+ADJECTIVES = {
+    'positive':[
+        ('мягкий', 'мягкая', 'мягкое', 'мягкие'), ('приятный', 'приятная', 'приятное', 'приятные'),
+        ('удобный', 'удобная', 'удобное', 'удобные'), ('плотный', 'плотная', 'плотное', 'плотные'),
+        ('яркий', 'яркая', 'яркое', 'яркие'), ('теплый', 'теплая', 'теплое', 'теплые'),
+        ('красивый', 'красивая', 'красивое', 'красивые'), ('быстрый', 'быстрая', 'быстрое', 'быстрые'),
+        ('аккуратный', 'аккуратная', 'аккуратное', 'аккуратные'), ('натуральный', 'натуральная', 'натуральное', 'натуральные'),
+        ('хороший', 'хорошая', 'хорошее', 'хорошие'), ('отличный', 'отличная', 'отличное', 'отличные'),
+    ],
+    'negative':[
+        ('тонкий', 'тонкая', 'тонкое', 'тонкие'), ('маленький', 'маленькая', 'маленькое', 'маленькие'),
+        ('кривой', 'кривая', 'кривое', 'кривые'), ('неприятный', 'неприятная', 'неприятное', 'неприятные'),
+        ('тусклый', 'тусклая', 'тусклое', 'тусклые'), ('долгий', 'долгая', 'долгое', 'долгие'),
+        ('жесткий', 'жесткая', 'жесткое', 'жесткие'), ('порванный', 'порванная', 'порванное', 'порванные'),
+        ('химический', 'химическая', 'химическое', 'химические'), ('большой', 'большая', 'большое', 'большие'),
+        ('плохой', 'плохая', 'плохое', 'плохие'), ('бесполезный', 'бесполезная', 'бесполезное', 'бесполезные'),
+    ],
+}
+
+# существительные и их род: 0 - мужской, 1 - женский, 2 - средний, 3 - множественное число
+NOUNS = [
+    ('материал', 0), ('размер', 0), ('цвет', 0), ('запах', 0), ('рукав', 0), ('шов', 0),
+    ('ткань', 1), ('доставка', 1), ('упаковка', 1), ('молния', 1), ('подошва', 1), ('посадка', 1),
+    ('качество', 2), ('изделие', 2), ('покрытие', 2),
+    ('швы', 3), ('нитки', 3), ('пуговицы', 3), ('карманы', 3),
+]
+
+OPENINGS = ['', 'Очень', 'Вроде', 'В целом', 'Честно говоря', 'Но', 'Правда', 'Кстати']
+ENDINGS = ['.', '!', '...', ' 👍', ' 😡', ', ', '. 5 звезд.', '!!']
+FILLERS = [
+    'Заказывала на подарок', 'Пришло быстро', 'Брала по скидке', 'Рекомендую', 'Не рекомендую',
+    'Соответствует описанию', 'На фото выглядит иначе', 'Продавец ответил быстро', 'Буду заказывать еще',
+]
+
+def generate_review(rng:random.Random, rating:int) -> str:
+    """
+        Функция генерации одного отзыва: несколько фраз прилагательное + существительное,
+        тональность прилагательных зависит от оценки
+        @rng:random.Random - генератор случайных чисел
+        @rating:int - оценка отзыва
+    """
+
+    positive_share = {5:0.9, 4:0.75, 3:0.5, 2:0.25, 1:0.1}[rating]
+    phrases = []
+
+    for _ in range(rng.randint(1, 5)):
+        polarity = 'positive' if rng.random() < positive_share else 'negative'
+        noun, gender = rng.choice(NOUNS)
+        adjective = rng.choice(ADJECTIVES[polarity])[gender]
+
+        # в русских отзывах встречается и "мягкая ткань", и "ткань мягкая"
+        phrase = f'{adjective} {noun}' if rng.random() < 0.6 else f'{noun} {adjective}'
+        phrases.append(f'{rng.choice(OPENINGS)} {phrase}{rng.choice(ENDINGS)}'.strip())
+
+        if rng.random() < 0.3:
+            phrases.append(rng.choice(FILLERS) + '.')
+
+    return ' '.join(phrases)
+
+def generate_reviews(size:int, seed:int=0) -> pd.DataFrame:
+    """
+        Функция генерации синтетического корпуса отзывов в формате parse_product (колонки review, rate)
+        @size:int - количество отзывов
+        @seed:int - зерно генератора, одинаковое зерно дает одинаковый корпус
+    """
+
+    rng = random.Random(seed)
+    ratings = rng.choices(list(RATING_WEIGHTS), weights=list(RATING_WEIGHTS.values()), k=size)
+
+    return pd.DataFrame({
+        'review':[generate_review(rng, rating) for rating in ratings],
+        'rate':ratings,
+    })
+
+
+class ReferenceClassifier:
+    """
+        Детерминированный линейный классификатор биграм для эталонных отчетов бенчмарка (вместо CatBoost)
+    """
+
+    def __init__(self, dim:int=300, seed:int=0) -> None:
+        self.weights = np.random.default_rng(seed).standard_normal(dim) / np.sqrt(dim)
+
+    def predict(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) @ self.weights > -0.05).astype(np.int64)
+
+def reference_models(seed:int=0) -> tuple:
+    """
+        Функция создания эталонных моделей бенчмарка: Navec со словарем синтетических отзывов и линейный классификатор.
+        Формы одного прилагательного близки друг к другу, поэтому часть биграм объединяется в кластеры.
+        Не зависят от файлов моделей, поэтому эталонные отчеты можно хранить в репозитории
+        @seed:int - зерно векторов и весов классификатора
+    """
+
+    from navec import Navec
+    from navec.pq import PQ
+    from navec.vocab import Vocab
+
+    rng = np.random.default_rng(seed)
+    dim, qdim = 300, 100
+
+    words, vectors = [], []
+    for polarity in ('positive', 'negative'):
+        for forms in ADJECTIVES[polarity]:
+            lemma = rng.standard_normal(dim) * 0.35
+            for form in forms:
+                words.append(form)
+                vectors.append(lemma + rng.standard_normal(dim) * 0.02)
+
+    for noun, _ in NOUNS:
+        words.append(noun)
+        vectors.append(rng.standard_normal(dim) * 0.25)
+
+    # каждое слово - свой центроид в каждом подпространстве, поэтому векторы восстанавливаются точно
+    vectors = np.array(vectors, dtype=np.float32)
+    indexes = np.tile(np.arange(len(words), dtype=np.uint8)[:, None], (1, qdim))
+    codes = vectors.reshape(len(words), qdim, dim // qdim).transpose(1, 0, 2).copy()
+
+    emb_model = Navec(None, Vocab(words, [1] * len(words)), PQ(len(words), dim, qdim, len(words), indexes, codes))
+
+    return emb_model, ReferenceClassifier(dim, seed)
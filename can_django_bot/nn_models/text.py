@@ -0,0 +1,69 @@
+import re
+
+import emoji
+from nltk.tokenize.destructive import NLTKWordTokenizer
+
+
+class TextNormalizer:
+    """
+        Однопроходная очистка и токенизация отзывов на заранее скомпилированных регулярках.
+        Результат совпадает с CAN_ML.remove_garbage + nltk sent_tokenize/word_tokenize: после очистки в тексте
+        остаются только буквы, _ и пробелы, поэтому nltk не может разбить его на несколько предложений, а из
+        правил токенизатора срабатывают только английские сокращения (cannot -> can not и т.п.)
+    """
+
+    def __init__(self) -> None:
+        # одиночные символы, которые remove_garbage считал эмодзи (c in emoji.UNICODE_EMOJI)
+        emoji_chars = sorted(char for char in emoji.UNICODE_EMOJI if len(char) == 1)
+        self.emoji_pattern = re.compile('[' + ''.join(map(re.escape, emoji_chars)) + ']') if emoji_chars else None
+
+        self.garbage_pattern = re.compile(r'[^\w\s]|\d')
+        self.latin_pattern = re.compile(r'[a-z]')
+        self.contractions = list(NLTKWordTokenizer.CONTRACTIONS2) + list(NLTKWordTokenizer.CONTRACTIONS3)
+
+    def clean(self, text:str) -> str:
+        """
+            Метод удаления мусора из текста: токены с эмодзи, пунктуация, цифры, регистр
+            @text:str - текст отзыва
+        """
+
+        tokens = text.split()
+
+        if self.emoji_pattern is not None:
+            tokens = [token for token in tokens if not self.emoji_pattern.search(token)]
+
+        return self.garbage_pattern.sub(' ', ' '.join(tokens).lower())
+
+    def tokenize(self, clean_text:str) -> list:
+        """
+            Метод разбиения очищенного текста на предложения и токены, возвращает список списков токенов
+            @clean_text:str - текст после clean
+        """
+
+        # английские сокращения - единственное правило токенизатора nltk, применимое к очищенному тексту
+        if self.latin_pattern.search(clean_text):
+            clean_text = f' {clean_text} '
+            for regexp in self.contractions:
+                clean_text = regexp.sub(r' \1 \2 ', clean_text)
+
+        tokens = clean_text.split()
+
+        return [tokens] if tokens else []
+
+    def process(self, texts:list) -> tuple:
+        """
+            Метод пакетной обработки колонки отзывов, возвращает очищенные тексты и предложения с токенами
+            @texts:list - тексты отзывов
+        """
+
+        clean_texts, sentences = [], []
+
+        for text in texts:
+            clean_text = self.clean(text)
+            clean_texts.append(clean_text)
+            sentences.append(self.tokenize(clean_text))
+
+        return clean_texts, sentences
+
+
+normalizer = TextNormalizer()
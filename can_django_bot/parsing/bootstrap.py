@@ -0,0 +1,137 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import dukpy
+
+# строковые литералы целиком (вместе с экранированием) и структурные символы
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[{},]', re.S)
+INIT_PATTERN = re.compile(r'wb\.spa\.init\(({.*?})\);')
+CLEANUP_PATTERNS = [
+    (re.compile('\n'), ''),
+    (re.compile(r'\s{2,}'), ''),
+    (re.compile('routes: routes,'), ''),
+    (re.compile('routesDictionary: routesDictionary,'), ''),
+    (re.compile('tmplHashes: tmplHashes'), ''),
+]
+
+
+def find_objects(text:str, keys:tuple) -> dict:
+    """
+        Функция поиска значений-объектов по ключам верхнего уровня объекта js/json за один проход: для каждого ключа
+        возвращается подстрока от { до парной }, строки пропускаются регуляркой целиком. Ключа нет в словаре, если
+        он не найден или его значение не объект
+        @text:str - текст объекта, начиная с {
+        @keys:tuple - имена ключей (в кавычках или без)
+    """
+
+    key_pattern = re.compile(r'\s*["\']?(' + '|'.join(map(re.escape, keys)) + r')["\']?\s*:\s*{')
+    objects, depth, key, start = {}, 0, None, None
+
+    for token in TOKEN_PATTERN.finditer(text):
+        char = token.group()
+
+        if char == '}':
+            depth -= 1
+            if key is not None and depth == 1:
+                objects[key] = text[start:token.end()]
+                key = None
+                if len(objects) == len(keys):
+                    break
+            continue
+        if char == '{':
+            depth += 1
+        elif char != ',':
+            continue
+
+        # ключи верхнего уровня идут сразу после { или , на глубине 1
+        if key is None and depth == 1:
+            match = key_pattern.match(text, token.end())
+            if match is not None and match.group(1) not in objects:
+                key, start = match.group(1), match.end() - 1
+
+    return objects
+
+def product_info_from_objects(router:dict, seo_helper:dict) -> dict:
+    """
+        Функция выбора нужных полей из init.router и init.seoHelper
+    """
+
+    info = {'imt_id':None, 'feedbacks_count':0, 'name':None, 'photo':None}
+
+    if router is not None and 'ssrModel' in router.keys():
+        product = router['ssrModel']['product']
+        info.update(imt_id=product['imtId'], feedbacks_count=product['feedbacks'], name=product['goodsName'])
+
+    if seo_helper is not None and 'items' in seo_helper.keys():
+        info['photo'] = seo_helper['items'][4]['attributesDictionary']['content']
+
+    return info
+
+def extract_product_info(script:str) -> dict:
+    """
+        Функция извлечения imtId, количества отзывов, названия и фото товара из скрипта wb.spa.init за один проход.
+        Объекты router и seoHelper вырезаются по скобкам и разбираются json, если в них есть конструкции js,
+        инициализация один раз вычисляется в dukpy
+        @script:str - текст скрипта с wb.spa.init
+    """
+
+    for pattern, replacement in CLEANUP_PATTERNS:
+        script = pattern.sub(replacement, script)
+
+    products_init = INIT_PATTERN.search(script).group(1)
+
+    try:
+        objects = find_objects(products_init, ('router', 'seoHelper'))
+        return product_info_from_objects(*(json.loads(objects[key]) if key in objects else None for key in ('router', 'seoHelper')))
+
+    except (ValueError, KeyError, IndexError, TypeError):
+        router, seo_helper = dukpy.evaljs(f'var init={products_init};[init.router, init.seoHelper];')
+        return product_info_from_objects(router, seo_helper)
+
+class ProductInfoCache:
+    """
+        Кэш метаданных товара (imtId, количество отзывов, название, фото) по ссылке: повторный парсинг
+        товара не скачивает и не разбирает страницу товара, пока запись не устарела
+    """
+
+    def __init__(self, ttl:float=3600, maxsize:int=10000) -> None:
+        """
+            @ttl:float - время жизни записи в секундах (количество отзывов со временем растет)
+            @maxsize:int - максимальное количество товаров
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url:str) -> dict:
+        with self.lock:
+            entry = self.data.get(url)
+
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+
+            self.data.move_to_end(url)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, url:str, info:dict) -> None:
+        with self.lock:
+            self.data[url] = (time.monotonic(), dict(info))
+            self.data.move_to_end(url)
+
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data.clear()
+
+
+product_info_cache = ProductInfoCache()
@@ -0,0 +1,119 @@
+import logging
+import threading
+import typing as tp
+from concurrent.futures import Future
+
+from envparse import env
+
+from scrapy import signals
+from scrapy.crawler import Crawler, CrawlerRunner
+from twisted.internet import defer, reactor
+
+
+class CrawlerService:
+    """
+        Долгоживущий сервис парсинга: один реактор Twisted в фоновом потоке на весь процесс.
+        Задачи принимаются из любого потока, ждут в очереди семафора и выполняются одновременно
+        не больше concurrency штук, результат возвращается через concurrent.futures.Future
+    """
+
+    def __init__(self, concurrency:int=4, settings:dict=None) -> None:
+        """
+            @concurrency:int - максимальное количество одновременных обходов
+            @settings:dict - общие настройки scrapy для всех задач
+        """
+        self.concurrency = concurrency
+        self.settings = settings or {}
+
+        self.runner = None
+        self.semaphore = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+            Метод запуска реактора в фоновом потоке (повторный вызов ничего не делает)
+        """
+
+        with self.lock:
+            if self.thread is not None:
+                return None
+
+            self.runner = CrawlerRunner(settings=self.settings)
+            self.semaphore = defer.DeferredSemaphore(self.concurrency)
+
+            self.thread = threading.Thread(target=reactor.run, kwargs={'installSignalHandlers':False}, name='crawler-reactor', daemon=True)
+            self.thread.start()
+
+    def submit(self, spidercls, settings:dict=None, on_item:tp.Callable[[dict], None]=None, **spider_kwargs) -> Future:
+        """
+            Метод постановки обхода в очередь, Future завершается статистикой scrapy после закрытия паука
+            @spidercls - класс паука
+            @settings:dict - настройки scrapy этой задачи поверх общих (например FEEDS)
+            @on_item - функция, получающая каждый собранный элемент сразу после сбора (вызывается в потоке реактора)
+            @spider_kwargs - аргументы паука
+        """
+
+        self.start()
+
+        future = Future()
+        reactor.callFromThread(self._enqueue, future, spidercls, settings or {}, on_item, spider_kwargs)
+
+        return future
+
+    def _enqueue(self, future:Future, spidercls, settings:dict, on_item, spider_kwargs:dict) -> None:
+        deferred = self.semaphore.run(self._crawl, future, spidercls, settings, on_item, spider_kwargs)
+        deferred.addErrback(lambda failure: future.set_exception(failure.value) if not future.done() else None)
+
+    def _crawl(self, future:Future, spidercls, settings:dict, on_item, spider_kwargs:dict):
+        # задачу отменили, пока она ждала в очереди
+        if not future.set_running_or_notify_cancel():
+            return defer.succeed(None)
+
+        crawler_settings = self.runner.settings.copy()
+        crawler_settings.setdict(settings, priority='spider')
+        crawler = Crawler(spidercls, crawler_settings)
+
+        if on_item is not None:
+            # сильная ссылка: обработчик часто лямбда, которую больше никто не держит
+            crawler.signals.connect(lambda item: on_item(item), signal=signals.item_scraped, weak=False)
+
+        deferred = self.runner.crawl(crawler, **spider_kwargs)
+        deferred.addCallback(lambda _: future.set_result(crawler.stats.get_stats()))
+
+        return deferred
+
+    def stop(self) -> None:
+        """
+            Метод остановки реактора, после остановки реактор Twisted нельзя запустить повторно в этом процессе
+        """
+
+        with self.lock:
+            if self.thread is None:
+                return None
+
+            reactor.callFromThread(reactor.stop)
+            self.thread.join()
+            logging.warning('Сервис парсинга остановлен')
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_crawler_service() -> CrawlerService:
+    """
+        Функция, возвращающая общий сервис парсинга процесса
+    """
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            settings = {}
+
+            # ответы страниц товаров и отзывов берутся из общего http кэша (parsing.http_cache)
+            if env('HTTP_CACHE_ENABLED', cast=bool, default=True):
+                settings.update(HTTPCACHE_ENABLED=True, HTTPCACHE_STORAGE='parsing.http_cache.SqliteCacheStorage')
+
+            _service = CrawlerService(concurrency=env('CRAWLER_CONCURRENCY', cast=int, default=4), settings=settings)
+
+        return _service
@@ -0,0 +1,144 @@
+import threading
+import typing as tp
+from itertools import chain
+
+import pandas as pd
+
+
+class FeedbackBuffer:
+    """
+        Колоночный буфер отзывов одного товара, который паук пополняет по мере скачивания страниц,
+        потребитель получает всю таблицу после конца обхода
+    """
+
+    COLUMNS = ('review', 'rate', 'created_at')
+
+    def __init__(self) -> None:
+        self.columns = {column:[] for column in self.COLUMNS}
+        self.name = None
+        self.photo = None
+
+        self.finished = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.columns['review'])
+
+    def add(self, item:dict) -> None:
+        """
+            Метод добавления элемента паука WildberriesCommentsSpider: отзыва, информации о товаре
+            или отзывов из локального хранилища (stored - колонки text, rating, created_at)
+            @item:dict - собранный элемент
+        """
+
+        with self.condition:
+            if 'name' in item:
+                self.name, self.photo = item['name'], item['photo']
+            elif 'stored' in item:
+                self.columns['review'].extend(text.strip().replace('\n', '') for text in item['stored']['text'])
+                self.columns['rate'].extend(item['stored']['rating'])
+                self.columns['created_at'].extend(item['stored']['created_at'])
+            else:
+                self.columns['review'].append(item['text'].strip().replace('\n', ''))
+                self.columns['rate'].append(item['rating'])
+                self.columns['created_at'].append(item['created_at'])
+
+            self.condition.notify_all()
+
+    def close(self, error:Exception=None) -> None:
+        """
+            Метод завершения буфера после закрытия паука
+            @error:Exception - ошибка обхода, если он не удался
+        """
+
+        with self.condition:
+            self.finished = True
+            self.error = error
+            self.condition.notify_all()
+
+    def frame(self, start:int=0, stop:int=None, columns:tuple=('review', 'rate')) -> pd.DataFrame:
+        """
+            Метод получения отзывов [start, stop) в виде таблицы
+            @columns:tuple - нужные колонки
+        """
+
+        with self.condition:
+            stop = len(self) if stop is None else stop
+            data = pd.DataFrame({column:self.columns[column][start:stop] for column in columns}, columns=list(columns))
+
+        data.index = pd.RangeIndex(start, start + data.shape[0])
+        return data
+
+    def wait(self, timeout:float=None) -> pd.DataFrame:
+        """
+            Метод ожидания конца обхода, возвращает все отзывы (колонки review, rate)
+            @timeout:float - сколько секунд ждать (None - без ограничения)
+        """
+
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.finished, timeout):
+                raise TimeoutError(f'Обход не завершился за {timeout} секунд')
+
+            if self.error is not None:
+                raise self.error
+
+        return self.frame()
+
+
+def chunk_frames(frames:tp.Iterable[pd.DataFrame], chunk_size:int) -> tp.Iterator[pd.DataFrame]:
+    """
+        Генератор порций ровно по chunk_size отзывов (последняя может быть меньше) из потока таблиц
+        @frames:Iterable[pd.DataFrame] - таблицы отзывов в порядке поступления
+        @chunk_size:int - количество отзывов в порции
+    """
+
+    pending, rows, offset = [], 0, 0
+
+    def take(data:pd.DataFrame) -> pd.DataFrame:
+        # номера строк сквозные, как у среза общей таблицы
+        nonlocal offset
+
+        data = data.reset_index(drop=True)
+        data.index = pd.RangeIndex(offset, offset + data.shape[0])
+        offset += data.shape[0]
+
+        return data
+
+    for frame in frames:
+        pending.append(frame)
+        rows += frame.shape[0]
+
+        if rows >= chunk_size:
+            data = pd.concat(pending, ignore_index=True)
+            full = rows - rows % chunk_size
+
+            for start in range(0, full, chunk_size):
+                yield take(data.iloc[start:start + chunk_size])
+
+            pending, rows = [data.iloc[full:]], rows - full
+
+    if rows:
+        yield take(pd.concat(pending, ignore_index=True))
+
+def split_stream(frames:tp.Iterable[pd.DataFrame], chunk_size:int) -> tp.Tuple[pd.DataFrame, tp.Iterator[pd.DataFrame]]:
+    """
+        Функция выбора режима анализа потока таблиц отзывов (например товаров категории по мере парсинга), как в analize_df:
+        пока отзывов не больше chunk_size, ждет конца потока и возвращает (вся таблица, None),
+        как только их стало больше - (None, порции по chunk_size), остальные таблицы потока дочитываются при обходе порций
+        @frames:Iterable[pd.DataFrame] - таблицы отзывов с колонками review, rate
+        @chunk_size:int - размер порции run_stream
+    """
+
+    frames = iter(frames)
+    head, rows = [], 0
+
+    for frame in frames:
+        head.append(frame)
+        rows += frame.shape[0]
+
+        if rows > chunk_size:
+            return None, chunk_frames(chain(head, frames), chunk_size)
+
+    data = pd.concat(head, ignore_index=True) if head else pd.DataFrame({'review':[], 'rate':[]})
+    return data, None
@@ -0,0 +1,281 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+import typing as tp
+from datetime import datetime, timezone
+
+from envparse import env
+
+
+def parse_created(value:str) -> datetime:
+    """
+        Функция разбора даты отзыва wb (createdDate) в datetime с часовым поясом UTC
+        @value:str - дата в формате ISO, например 2022-01-05T12:34:56.123Z
+    """
+
+    # fromisoformat старых версий python понимает только 3 или 6 знаков долей секунды
+    value = re.sub(r'\.(\d+)', lambda match: '.' + match.group(1)[:6].ljust(6, '0'), value.replace('Z', '+00:00'))
+    created = datetime.fromisoformat(value)
+
+    return created.replace(tzinfo=timezone.utc) if created.tzinfo is None else created.astimezone(timezone.utc)
+
+def is_old(mark:dict, text:str, rating:int, created_at:str) -> bool:
+    """
+        Функция проверки, что отзыв уже есть в хранилище: он раньше отметки или совпадает с одним из последних отзывов
+        @mark:dict - отметка синхронизации из mark хранилища
+    """
+
+    last_created = mark['last_created']
+    if last_created is None:
+        return False
+
+    created_at = parse_created(created_at)
+    return created_at < last_created or (created_at == last_created and (text, rating) in mark['last_keys'])
+
+def mark_moved(mark:dict, since:dict) -> bool:
+    """
+        Функция проверки, что отметка сдвинулась после начала обхода (отзывы товара записал другой обход)
+        @mark:dict - текущая отметка, None - отзывы товара удалены
+        @since:dict - отметка на начало обхода
+    """
+
+    return mark is None or (mark['count'], mark['last_created']) != (since['count'], since['last_created'])
+
+
+class FeedbackStore:
+    """
+        Локальное хранилище отзывов товаров в sqlite: отзывы каждого imtId в порядке dateAsc и отметка синхронизации
+        (сколько отзывов сохранено и дата последнего), по которой повторный парсинг скачивает только новые страницы
+    """
+
+    def __init__(self, path:str) -> None:
+        """
+            @path:str - файл sqlite базы
+        """
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS reviews ('
+            'imt_id INTEGER, position INTEGER, text TEXT, rating INTEGER, created_at TEXT, '
+            'PRIMARY KEY (imt_id, position)) WITHOUT ROWID'
+        )
+        self._db.execute('CREATE TABLE IF NOT EXISTS marks (imt_id INTEGER PRIMARY KEY, count INTEGER, last_created TEXT, synced REAL)')
+        self._db.commit()
+
+    def mark(self, imt_id:int) -> dict:
+        """
+            Метод получения отметки синхронизации товара, None - отзывы товара не сохранялись.
+            last_created - дата последнего отзыва (datetime UTC, None - отзывов нет),
+            last_keys - (текст, оценка) отзывов с этой датой, чтобы отличить их от новых с той же датой
+            @imt_id:int - imtId товара
+        """
+
+        with self._lock:
+            return self._mark(imt_id)
+
+    def load(self, imt_id:int) -> tp.Dict[str, list]:
+        """
+            Метод получения сохраненных отзывов товара по колонкам text, rating, created_at
+            @imt_id:int - imtId товара
+        """
+
+        with self._lock:
+            rows = self._db.execute('SELECT text, rating, created_at FROM reviews WHERE imt_id = ? ORDER BY position', (imt_id,)).fetchall()
+
+        text, rating, created_at = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+        return {'text':text, 'rating':rating, 'created_at':created_at}
+
+    def append(self, imt_id:int, rows:tp.List[tuple], product:dict=None, since:dict=None) -> None:
+        """
+            Метод добавления новых отзывов товара в конец и сдвига отметки синхронизации.
+            Если за время обхода отзывы товара записал другой обход, уже записанные отбрасываются
+            @imt_id:int - imtId товара
+            @rows:list - отзывы (текст, оценка, дата) в порядке dateAsc
+            @product:dict - ссылка, название, фото и количество отзывов товара (sqlite хранилище их не сохраняет)
+            @since:dict - отметка, по которой отобраны rows (None - не сверять)
+        """
+
+        with self._lock:
+            if since is not None:
+                mark = self._mark(imt_id)
+
+                if mark is None:
+                    logging.warning(f'Отзывы товара {imt_id} удалены во время обхода, хранилище не обновлено')
+                    return None
+
+                if mark_moved(mark, since):
+                    rows = [row for row in rows if not is_old(mark, *row)]
+
+            self._append(imt_id, rows)
+            self._db.commit()
+
+    def replace(self, imt_id:int, rows:tp.List[tuple], product:dict=None) -> None:
+        """
+            Метод замены всех отзывов товара (полная синхронизация)
+        """
+
+        with self._lock:
+            self._reset(imt_id)
+            self._append(imt_id, rows)
+            self._db.commit()
+
+    def reset(self, imt_id:int) -> None:
+        """
+            Метод удаления отзывов товара, следующий парсинг скачает все отзывы заново
+        """
+
+        with self._lock:
+            self._reset(imt_id)
+            self._db.commit()
+
+    def _mark(self, imt_id:int) -> dict:
+        row = self._db.execute('SELECT count, last_created FROM marks WHERE imt_id = ?', (imt_id,)).fetchone()
+        if row is None:
+            return None
+
+        count, last_created = row
+        last_keys = self._db.execute('SELECT text, rating FROM reviews WHERE imt_id = ? AND created_at = ?', (imt_id, last_created)).fetchall()
+
+        return {'count':count, 'last_created':parse_created(last_created) if last_created else None, 'last_keys':set(last_keys)}
+
+    def _append(self, imt_id:int, rows:tp.List[tuple]) -> None:
+        row = self._db.execute('SELECT count, last_created FROM marks WHERE imt_id = ?', (imt_id,)).fetchone()
+        count, last_created = row if row is not None else (0, '')
+
+        self._db.executemany(
+            'INSERT OR REPLACE INTO reviews (imt_id, position, text, rating, created_at) VALUES (?, ?, ?, ?, ?)',
+            ((imt_id, count + index, text, rating, created_at) for index, (text, rating, created_at) in enumerate(rows)),
+        )
+
+        # новые отзывы всегда позже отметки
+        if rows:
+            last_created = max((created_at for _, _, created_at in rows), key=parse_created)
+
+        self._db.execute(
+            'INSERT OR REPLACE INTO marks (imt_id, count, last_created, synced) VALUES (?, ?, ?, ?)',
+            (imt_id, count + len(rows), last_created, time.time()),
+        )
+
+    def _reset(self, imt_id:int) -> None:
+        self._db.execute('DELETE FROM reviews WHERE imt_id = ?', (imt_id,))
+        self._db.execute('DELETE FROM marks WHERE imt_id = ?', (imt_id,))
+
+
+class FeedbackSync:
+    """
+        Синхронизация отзывов одного товара за один обход: решает, с какого skip скачивать страницы,
+        отбрасывает уже сохраненные отзывы из перекрытия и после обхода дописывает новые в хранилище.
+        Страницы начинаются на overlap отзывов раньше отметки, чтобы удаленные на wb отзывы не приводили к пропускам
+    """
+
+    def __init__(self, store:FeedbackStore, imt_id:int, feedbacks_count:int, overlap:int=100, product:dict=None) -> None:
+        """
+            @store:FeedbackStore - хранилище (None - скачиваются все отзывы, ничего не сохраняется)
+            @imt_id:int - imtId товара
+            @feedbacks_count:int - количество отзывов на wb
+            @overlap:int - сколько последних сохраненных отзывов скачивается повторно
+            @product:dict - ссылка, название, фото и количество отзывов товара для хранилища
+        """
+        self.store = store
+        self.imt_id = imt_id
+        self.product = product
+
+        mark = store.mark(imt_id) if store is not None and imt_id is not None else None
+
+        # отзывов на wb стало намного меньше, чем сохранено, - синхронизируем заново
+        self.incremental = mark is not None and mark['count'] - overlap < feedbacks_count
+        self.mark = mark if self.incremental else None
+        self.start = max(0, mark['count'] - overlap) if self.incremental else 0
+
+        self.stored = store.load(imt_id) if self.incremental else None
+        self.pages = {}
+        self.overlap_found = False
+
+    def expect(self, skips:tp.Iterable[int]) -> None:
+        """
+            Метод регистрации запрошенных страниц
+            @skips:Iterable[int] - значения skip запросов
+        """
+
+        self.pages = {skip:None for skip in skips}
+
+    def is_old(self, text:str, rating:int, created_at:str) -> bool:
+        return is_old(self.mark, text, rating, created_at)
+
+    def filter(self, skip:int, feedbacks:list) -> list:
+        """
+            Метод приема страницы отзывов wb, возвращает только новые отзывы
+            @skip:int - skip запроса страницы
+            @feedbacks:list - отзывы из ответа (None - страниц больше нет)
+        """
+
+        feedbacks = feedbacks or []
+
+        if self.incremental:
+            old = [self.is_old(feedback['text'], feedback['productValuation'], feedback['createdDate']) for feedback in feedbacks]
+            if skip == self.start and any(old):
+                self.overlap_found = True
+
+            feedbacks = [feedback for feedback, is_old in zip(feedbacks, old) if not is_old]
+
+        self.pages[skip] = [(feedback['text'], feedback['productValuation'], feedback['createdDate']) for feedback in feedbacks]
+        return feedbacks
+
+    def commit(self) -> None:
+        """
+            Метод сохранения новых отзывов после обхода, если скачаны все запрошенные страницы
+        """
+
+        if self.store is None or self.imt_id is None:
+            return None
+
+        if any(rows is None for rows in self.pages.values()):
+            logging.warning(f'Не все страницы отзывов товара {self.imt_id} скачаны, хранилище не обновлено')
+            return None
+
+        rows = [row for skip in sorted(self.pages) for row in self.pages[skip]]
+
+        if not self.incremental:
+            self.store.replace(self.imt_id, rows, product=self.product)
+        elif self.start > 0 and not self.overlap_found:
+            # перекрытие не нашлось: удалено больше overlap отзывов и между отметкой и страницами может быть пропуск
+            logging.warning(f'Отзывы товара {self.imt_id} разошлись с сохраненными, следующий парсинг скачает их заново')
+            self.store.reset(self.imt_id)
+        else:
+            # другой обход того же товара мог записать часть этих отзывов после отметки, хранилище сверит ее под блокировкой
+            self.store.append(self.imt_id, rows, product=self.product, since=self.mark)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def set_feedback_store(store) -> None:
+    """
+        Функция замены общего хранилища отзывов процесса (например на хранилище в базе django, см. bot.feedback_store)
+        @store - объект с методами mark, load, append (с отметкой since), replace и reset, как у FeedbackStore
+    """
+    global _store
+
+    with _store_lock:
+        _store = store
+
+def get_feedback_store() -> FeedbackStore:
+    """
+        Функция, возвращающая общее хранилище отзывов процесса, None - хранилище выключено (FEEDBACK_STORE_ENABLED=0).
+        По умолчанию sqlite файл FEEDBACK_STORE_PATH
+    """
+    global _store
+
+    if not env('FEEDBACK_STORE_ENABLED', cast=bool, default=True):
+        return None
+
+    with _store_lock:
+        if _store is None:
+            _store = FeedbackStore(env('FEEDBACK_STORE_PATH', default='./parsing/feedbacks.sqlite3'))
+
+        return _store
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import typing as tp
+import zlib
+
+from envparse import env
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+# эндпоинты wb и время жизни их ответов в секундах, адреса, которые не подходят ни под один шаблон, не кэшируются
+ENDPOINTS = (
+    ('feedbacks', r'^https?://public-feedbacks\.wildberries\.ru/', env('HTTP_CACHE_FEEDBACKS_TTL', cast=int, default=30 * 60)),
+    ('product', r'^https?://(www\.)?wildberries\.ru/catalog/\d+/', env('HTTP_CACHE_PRODUCT_TTL', cast=int, default=60 * 60)),
+    ('category', r'^https?://(www\.)?wildberries\.ru/catalog/', env('HTTP_CACHE_CATEGORY_TTL', cast=int, default=30 * 60)),
+)
+
+
+class HttpCache:
+    """
+        Дисковый кэш http ответов в sqlite, общий для пауков scrapy и парсера категорий.
+        Ключ - метод, адрес и тело запроса (отзывы запрашиваются POST с imtId/skip/take), время жизни задается
+        для каждого эндпоинта, при превышении размера вытесняются давно не запрашиваемые ответы
+    """
+
+    def __init__(self, path:str, max_bytes:int=512 * 1024 * 1024, endpoints:tuple=ENDPOINTS, flush_every:int=100) -> None:
+        """
+            @path:str - файл sqlite базы
+            @max_bytes:int - максимальный суммарный размер сжатых ответов
+            @endpoints:tuple - кортежи (название, шаблон адреса, время жизни в секундах)
+            @flush_every:int - через сколько попаданий записывать время последнего запроса ответов в базу
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.endpoints = [(name, re.compile(pattern), ttl) for name, pattern, ttl in endpoints]
+
+        self.hits = {name:0 for name, _, _ in self.endpoints}
+        self.misses = {name:0 for name, _, _ in self.endpoints}
+
+        # время последнего запроса попавших ответов, ключ -> время: пишется в базу пачкой, а не коммитом на каждое попадание
+        self._used = {}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, endpoint TEXT, url TEXT, status INTEGER, headers TEXT, body BLOB, '
+            'size INTEGER, created REAL, last_used REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+        self._db.commit()
+
+        with self._lock:
+            self._purge_expired()
+            self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def request_key(namespace:str, method:str, url:str, body:bytes=None) -> str:
+        """
+            Метод, возвращающий ключ запроса
+            @namespace:str - клиент (scrapy хранит сжатые ответы как есть, requests - уже распакованные)
+        """
+
+        digest = hashlib.sha256(f'{namespace}\n{method.upper()}\n{url}\n'.encode())
+        digest.update(body or b'')
+
+        return digest.hexdigest()
+
+    def endpoint(self, url:str) -> tp.Tuple[str, int]:
+        """
+            Метод, возвращающий название эндпоинта и время жизни его ответов, (None, None) - адрес не кэшируется
+        """
+
+        for name, pattern, ttl in self.endpoints:
+            if pattern.match(url):
+                return name, ttl
+
+        return None, None
+
+    def get(self, key:str, url:str) -> tp.Tuple[int, dict, bytes]:
+        """
+            Метод получения сохраненного ответа (статус, заголовки, тело), None - ответа нет или он устарел
+            @key:str - ключ из request_key
+            @url:str - адрес запроса
+        """
+
+        name, ttl = self.endpoint(url)
+        if name is None:
+            return None
+
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute('SELECT status, headers, body FROM responses WHERE key = ? AND created >= ?', (key, now - ttl)).fetchone()
+
+            if row is None:
+                self.misses[name] += 1
+                return None
+
+            self._used[key] = now
+            self.hits[name] += 1
+
+            if len(self._used) >= self.flush_every:
+                self._flush_used()
+                self._db.commit()
+
+        status, headers, body = row
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def set(self, key:str, url:str, status:int, headers:dict, body:bytes) -> None:
+        """
+            Метод сохранения ответа, сохраняются только успешные ответы кэшируемых эндпоинтов
+            @headers:dict - заголовки, название -> список значений
+        """
+
+        name, _ = self.endpoint(url)
+        if name is None or status != 200:
+            return None
+
+        body = zlib.compress(body)
+        now = time.time()
+
+        with self._lock:
+            self._used.pop(key, None)
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, url, status, headers, body, size, created, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, name, url, status, json.dumps(headers), body, len(body), now, now),
+            )
+            self._size += len(body) - (old[0] if old is not None else 0)
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+            self._db.commit()
+
+    def _flush_used(self) -> None:
+        self._db.executemany('UPDATE responses SET last_used = ? WHERE key = ?', [(used, key) for key, used in self._used.items()])
+        self._used.clear()
+
+    def flush(self) -> None:
+        """
+            Метод записи накопленного времени последнего запроса ответов в базу
+        """
+
+        with self._lock:
+            self._flush_used()
+            self._db.commit()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+
+        for name, _, ttl in self.endpoints:
+            self._db.execute('DELETE FROM responses WHERE endpoint = ? AND created < ?', (name, now - ttl))
+
+        self._db.commit()
+
+    def _evict(self) -> None:
+        """
+            Вытеснение: сначала устаревшие ответы, затем давно не запрашиваемые, пока размер не станет меньше 90% лимита
+        """
+
+        self._flush_used()
+        self._purge_expired()
+        self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        target = self.max_bytes * 0.9
+        evicted = []
+
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            if self._size <= target:
+                break
+
+            evicted.append((key,))
+            self._size -= size
+
+        self._db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+        if evicted:
+            logging.warning(f'Из http кэша вытеснено {len(evicted)} ответов')
+
+    def stats(self) -> dict:
+        """
+            Метод, возвращающий количество записей, размер и попадания/промахи по эндпоинтам
+        """
+
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+            return {
+                'entries': entries,
+                'bytes': self._size,
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._used.clear()
+            self._db.execute('DELETE FROM responses')
+            self._db.commit()
+            self._size = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_http_cache() -> HttpCache:
+    """
+        Функция, возвращающая общий http кэш процесса, None - кэш выключен (HTTP_CACHE_ENABLED=0)
+    """
+    global _cache
+
+    if not env('HTTP_CACHE_ENABLED', cast=bool, default=True):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(
+                env('HTTP_CACHE_PATH', default='./parsing/http_cache.sqlite3'),
+                max_bytes=env('HTTP_CACHE_MAX_BYTES', cast=int, default=512 * 1024 * 1024),
+            )
+
+        return _cache
+
+
+class SqliteCacheStorage:
+    """
+        Хранилище для HttpCacheMiddleware scrapy поверх общего HttpCache
+        (HTTPCACHE_STORAGE = 'parsing.http_cache.SqliteCacheStorage'), время жизни определяется эндпоинтом
+    """
+
+    def __init__(self, settings) -> None:
+        self.cache = None
+
+    def open_spider(self, spider) -> None:
+        self.cache = get_http_cache()
+
+    def close_spider(self, spider) -> None:
+        if self.cache is not None:
+            self.cache.flush()
+            stats = self.cache.stats()
+            logging.info(f'http кэш: {stats["entries"]} ответов, {stats["bytes"]} байт, попадания {stats["hits"]}, промахи {stats["misses"]}')
+
+    def retrieve_response(self, spider, request):
+        if self.cache is None:
+            return None
+
+        cached = self.cache.get(self.cache.request_key('scrapy', request.method, request.url, request.body), request.url)
+        if cached is None:
+            return None
+
+        status, headers, body = cached
+        headers = Headers({name:[value.encode('latin-1') for value in values] for name, values in headers.items()})
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+
+        return respcls(url=request.url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response) -> None:
+        if self.cache is None:
+            return None
+
+        headers = {name.decode('latin-1'):[value.decode('latin-1') for value in values] for name, values in response.headers.items()}
+        self.cache.set(self.cache.request_key('scrapy', request.method, request.url, request.body), request.url, response.status, headers, response.body)
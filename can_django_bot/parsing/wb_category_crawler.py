@@ -1,52 +1,170 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas
-import lxml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests.structures import CaseInsensitiveDict
+import lxml.html
 
+import threading
 import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+
+from parsing.http_cache import get_http_cache
+
+HEADERS = {
+    "Accept": "*/*",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:84.0) Gecko/20100101 Firefox/84.0",
+}
+
+# карточки товаров: элементы с классом product-card и первая ссылка product-card__main внутри
+CARD_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' product-card ')]"
+LINK_XPATH = ".//a[contains(concat(' ', normalize-space(@class), ' '), ' product-card__main ')][1]/@href"
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size:int=16) -> requests.Session:
+    """
+        Функция, возвращающая общую сессию с пулом keep-alive соединений и повторами при ошибках сервера
+        @pool_size:int - количество соединений в пуле
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+            )
+
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+
+        return _session
 
 def get_html(url:str, params:dict=None) -> requests.models.Response:
     """
-        Функция, возвращающая объект типа Response с ответом на запрос 
+        Функция, возвращающая объект типа Response с ответом на запрос, страницы категорий берутся из http кэша, если он включен
         @url:str - ссылка на категорию wb
         @params:dict - параметры запросаы
     """
 
-    headers = {
-        "Accept": "*/*",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:84.0) Gecko/20100101 Firefox/84.0",
-    }
-    html = requests.get(url, headers=headers, params=params)
+    cache = get_http_cache()
+    if cache is None:
+        return get_session().get(url, params=params)
+
+    full_url = requests.Request('GET', url, params=params).prepare().url
+    key = cache.request_key('requests', 'GET', full_url)
+
+    cached = cache.get(key, full_url)
+    if cached is not None:
+        html = requests.models.Response()
+        html.status_code, headers, html._content = cached
+        html.headers = CaseInsensitiveDict({name:values[0] for name, values in headers.items()})
+        html.url = full_url
+        html.encoding = requests.utils.get_encoding_from_headers(html.headers)
+
+        return html
+
+    html = get_session().get(url, params=params)
+
+    # requests уже распаковал тело, поэтому заголовки сжатия не сохраняем
+    headers = {name:[value] for name, value in html.headers.items() if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+    cache.set(key, full_url, html.status_code, headers, html.content)
+
     return html
 
 def get_content(html:requests.models.Response) -> list:
     """
-        Функция поиска на странице карточек с товаром
+        Функция поиска на странице карточек с товаром, разбирает страницу lxml и достает только ссылки карточек и заголовок
         @html:requests.models.Response - ответ сервера, из которого будем доставать html
     """
-    
-    soup = BeautifulSoup(html.text, 'html.parser')
-    items = soup.find_all('div', class_="product-card")
-    
-    title = soup.h1.text
+
+    tree = lxml.html.fromstring(html.text)
+
+    titles = tree.xpath('//h1')
+    title = titles[0].text_content() if titles else None
+
     cards = []
 
-    for item in items:
-        cards.append(f'https://www.wildberries.ru{item.find("a", class_="product-card__main").get("href")}')
-        
+    for item in tree.xpath(CARD_XPATH):
+        links = item.xpath(LINK_XPATH)
+        if links:
+            cards.append(f'https://www.wildberries.ru{links[0]}')
+
     return cards, title
 
-def parse_product_category(url:str) -> tp.Union[tp.Tuple[list, str], None]:
+def get_page(url:str, page:int) -> tp.Tuple[list, str]:
     """
-        Главная функция, реализующая прасинг категории wb
+        Функция получения ссылок на товары с одной страницы категории
         @url:str - ссылка на категорию wb
+        @page:int - номер страницы
     """
-    
-    html = get_html(url)
-    if html.status_code == 200:
-        html = get_html(url, params={'sort': 'popular', 'page': 1})
-        cards, title = get_content(html)
-        return cards, title
-    else:
+
+    html = get_html(url, params={'sort': 'popular', 'page': page})
+
+    if html.status_code != 200:
         print(f'Ответ сервера:{html.status_code}. Парсинг невозможен!')
         raise Exception('Не удалось подключиться к wb через bs4')
+
+    return get_content(html)
+
+def stream_product_category(url:str, max_products:int=None, max_pages:int=50, workers:int=4) -> tp.Tuple[str, tp.Iterator[str]]:
+    """
+        Функция потокового парсинга категории wb: первая страница скачивается сразу (заголовок и проверка ответа),
+        следующие - параллельно по workers штук. Возвращает заголовок и генератор ссылок на товары в порядке страниц,
+        поэтому парсинг товаров можно начинать, не дожидаясь последней страницы
+        @url:str - ссылка на категорию wb
+        @max_products:int - сколько товаров нужно (None - все товары с max_pages страниц)
+        @max_pages:int - максимальное количество страниц
+        @workers:int - количество одновременно скачиваемых страниц
+    """
+
+    cards, title = get_page(url, 1)
+
+    def links() -> tp.Iterator[str]:
+        seen = set()
+
+        def take(page_cards:list) -> tp.Iterator[str]:
+            for card in page_cards:
+                if card not in seen and (max_products is None or len(seen) < max_products):
+                    seen.add(card)
+                    yield card
+
+        yield from take(cards)
+
+        if not cards or (max_products is not None and len(seen) >= max_products):
+            return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = iter(range(2, max_pages + 1))
+            futures = [executor.submit(get_page, url, page) for _, page in zip(range(workers), pages)]
+
+            while futures:
+                page_cards, _ = futures.pop(0).result()
+                yield from take(page_cards)
+
+                # пустая страница - категория закончилась
+                if not page_cards or (max_products is not None and len(seen) >= max_products):
+                    for future in futures:
+                        future.cancel()
+                    return None
+
+                page = next(pages, None)
+                if page is not None:
+                    futures.append(executor.submit(get_page, url, page))
+
+    return title, links()
+
+def parse_product_category(url:str, max_products:int=None, max_pages:int=1) -> tp.Union[tp.Tuple[list, str], None]:
+    """
+        Главная функция, реализующая прасинг категории wb
+        @url:str - ссылка на категорию wb
+        @max_products:int - сколько товаров нужно (None - все товары с max_pages страниц)
+        @max_pages:int - максимальное количество страниц
+    """
+
+    title, links = stream_product_category(url, max_products=max_products, max_pages=max_pages)
+    return list(links), title
@@ -1,28 +1,105 @@
 import json
 import logging
-import math
-import re
+import queue
+import threading
+import typing as tp
 from typing import Tuple
 import requests
-import uuid
-import os
 
-import dukpy
 from envparse import env
 
 import scrapy
+from scrapy import signals
 from scrapy.exceptions import CloseSpider
-from scrapy.crawler import CrawlerRunner
-from twisted.internet import reactor
+from twisted.internet import defer, threads
 
 import pandas as pd
 
+from parsing.bootstrap import extract_product_info, product_info_cache
+from parsing.crawler_service import get_crawler_service
+from parsing.feedback_buffer import FeedbackBuffer
+from parsing.feedback_store import FeedbackSync, get_feedback_store
+
 import logging
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
 
 
+FEEDBACKS_URL = "https://public-feedbacks.wildberries.ru/api/v1/feedbacks/site"
+
+def feedback_request_bodies(imt_id, feedbacks_count:int, start:int=0, step:int=1000) -> list:
+    """
+        Функция, возвращающая тела запросов страниц отзывов товара
+        @imt_id - imtId товара
+        @feedbacks_count:int - количество отзывов
+        @start:int - с какого отзыва начинать (отзывы до него уже сохранены локально)
+        @step:int - отзывов на странице
+    """
+
+    return [
+        {
+            "imtId": imt_id,
+            "skip": skip,
+            "take": step,
+            "order": "dateAsc"
+        }
+        for skip in range(start, feedbacks_count, step)
+    ]
+
+
+def open_sync(imt_id, feedbacks_count:int, product:dict=None) -> FeedbackSync:
+    """
+        Функция создания синхронизации товара с хранилищем отзывов. Читает отметку и сохраненные отзывы (sqlite или база),
+        поэтому пауки вызывают ее в пуле потоков реактора. Если хранилище недоступно, товар парсится целиком без сохранения
+    """
+
+    try:
+        return FeedbackSync(get_feedback_store(), imt_id, feedbacks_count, product=product)
+    except Exception as e:
+        logging.error(f'{e} возникла во время чтения хранилища отзывов товара {imt_id}')
+        return FeedbackSync(None, imt_id, feedbacks_count)
+
+
 class BaseSpider(scrapy.Spider):
+    """
+        Базовый паук: обращения к хранилищу отзывов выполняются в пуле потоков реактора, чтобы запись в базу
+        не останавливала остальные обходы сервиса парсинга. Синхронизации товаров, известных до запуска, создаются
+        в prepare (обработчик spider_opened, движок дожидается его до первого запроса)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BaseSpider, self).__init__(*args, **kwargs)
+
+        # незавершенные записи в хранилище, closed дожидается их
+        self.commits = []
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(BaseSpider, cls).from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.prepare, signal=signals.spider_opened)
+
+        return spider
+
+    def prepare(self):
+        return None
+
+    def commit_sync(self, sync:FeedbackSync):
+        """
+            Метод сохранения новых отзывов товара в пуле потоков реактора, возвращает Deferred записи
+        """
+
+        deferred = threads.deferToThread(sync.commit)
+        deferred.addErrback(lambda failure: logging.error(f'{failure.value!r} возникла во время сохранения отзывов товара {sync.imt_id}'))
+
+        self.commits.append(deferred)
+        return deferred
+
     def closed(self, reason):
+        deferred = defer.DeferredList(self.commits)
+        deferred.addCallback(lambda _: self.send_callback())
+
+        return deferred
+
+    def send_callback(self):
         callback_url = getattr(self, 'callback_url', None)
         callback_params_raw = getattr(self, 'callback_params', None)
         callback_params = {
@@ -47,70 +124,97 @@ class WildberriesCommentsSpider(BaseSpider):
 
         self.photo = None
         self.product_name = None
+        self.info_sent = False
+        self.cached_info = None
+        self.sync = None
+        self.failed = False
 
-    def start_requests(self):
-        yield scrapy.Request(self.good_url, self.parse_good)
+    def prepare(self):
+        # метаданные товара недавно уже извлекали - отзывы запрашиваются сразу без страницы товара
+        info = product_info_cache.get(self.good_url)
 
-    def parse_good(self, response):
-        imt_id, feedbacks_count = self.load_product_info(response)
+        # start_requests не может отдавать элементы, поэтому товар без отзывов всегда идет через свою страницу
+        if info is None or not info['feedbacks_count']:
+            return None
 
-        step = 1000
-        skip = 0
+        self.cached_info = info
 
-        for _ in range(math.ceil(feedbacks_count / step)):
-            request_body = {
-                "imtId": imt_id,
-                "skip": skip,
-                "take": step,
-                "order": "dateAsc"
-            }
+        self.product_name, self.photo = self.cached_info['name'], self.cached_info['photo']
 
-            yield scrapy.Request("https://public-feedbacks.wildberries.ru/api/v1/feedbacks/site", self.parse_comments_request, method="POST", body=json.dumps(request_body))
+        def opened(sync):
+            self.sync = sync
 
-            skip += step
+        deferred = threads.deferToThread(open_sync, self.cached_info['imt_id'], self.cached_info['feedbacks_count'], self.product(self.cached_info['feedbacks_count']))
+        deferred.addCallback(opened)
 
-        yield {'name':self.product_name, 'photo':self.photo}
+        return deferred
 
-    def load_product_info(self, response):
-        imt_id = None
-        feedbacks_count = 0
+    def start_requests(self):
+        if self.cached_info is None:
+            yield scrapy.Request(self.good_url, self.parse_good)
+        else:
+            # элемент с названием и фото отправит первый ответ с отзывами: start_requests может возвращать только запросы
+            yield from self.feedback_requests(self.cached_info['imt_id'], self.cached_info['feedbacks_count'])
 
-        products_data_js = response.xpath('//script[contains(., "wb.spa.init")]/text()').get()
+    async def parse_good(self, response):
+        imt_id, feedbacks_count = self.load_product_info(response)
+        self.sync = await threads.deferToThread(open_sync, imt_id, feedbacks_count, self.product(feedbacks_count))
 
-        products_data_js = re.sub('\n', '', products_data_js)
-        products_data_js = re.sub(r'\s{2,}', '', products_data_js)
+        return [*self.feedback_requests(imt_id, feedbacks_count), *self.info_items()]
 
-        products_data_js = re.sub('routes: routes,', '', products_data_js)
-        products_data_js = re.sub('routesDictionary: routesDictionary,', '', products_data_js)
-        products_data_js = re.sub('tmplHashes: tmplHashes', '', products_data_js)
+    def product(self, feedbacks_count:int) -> dict:
+        # поля товара для хранилища отзывов
+        return {'url':self.good_url, 'name':self.product_name, 'photo':self.photo, 'feedbacks_count':feedbacks_count}
 
-        products_init = re.findall(r'wb\.spa\.init\(({.*?})\);', products_data_js)[0]
-        
-        if products_init is not None and str(products_init) != '':
-            interpreter = dukpy.JSInterpreter()
+    def info_items(self):
+        # название и фото, затем отзывы, уже сохраненные локально
+        self.info_sent = True
+        yield {'name':self.product_name, 'photo':self.photo}
+
+        if self.sync.stored is not None:
+            yield {'stored':self.sync.stored}
 
-            evaled_data = interpreter.evaljs(f'init={products_init};init.router;')
-            evaled_data2 = interpreter.evaljs(f'init={products_init};init.seoHelper;')
+    def feedback_requests(self, imt_id, feedbacks_count):
+        bodies = feedback_request_bodies(imt_id, feedbacks_count, start=self.sync.start)
+        self.sync.expect(request_body['skip'] for request_body in bodies)
 
+        for request_body in bodies:
+            yield scrapy.Request(FEEDBACKS_URL, self.parse_comments_request, method="POST", body=json.dumps(request_body), errback=self.page_failed, cb_kwargs={'skip':request_body['skip']})
 
-            if 'ssrModel' in evaled_data.keys():
-                imt_id = evaled_data['ssrModel']['product']['imtId']
-                feedbacks_count = evaled_data['ssrModel']['product']['feedbacks']
-                self.product_name = evaled_data['ssrModel']['product']['goodsName']
+    def page_failed(self, failure):
+        self.failed = True
+        logging.error(f'Страница отзывов не скачана: {failure.value!r}')
+
+    def closed(self, reason):
+        # в хранилище попадают только полностью скачанные отзывы
+        if self.sync is not None and not self.failed:
+            self.commit_sync(self.sync)
+
+        return super(WildberriesCommentsSpider, self).closed(reason)
+
+    def load_product_info(self, response):
+        products_data_js = response.xpath('//script[contains(., "wb.spa.init")]/text()').get()
 
-            if 'items' in evaled_data2.keys():
-                self.photo = evaled_data2['items'][4]['attributesDictionary']['content']
+        info = extract_product_info(products_data_js)
+        if info['imt_id'] is not None:
+            product_info_cache.set(self.good_url, info)
 
+        self.product_name, self.photo = info['name'], info['photo']
 
-        return imt_id, feedbacks_count
+        return info['imt_id'], info['feedbacks_count']
 
-    def parse_comments_request(self, response):
+    def parse_comments_request(self, response, skip):
         feedbacks = json.loads(response.text)
 
+        if not self.info_sent:
+            yield from self.info_items()
+
+        new_feedbacks = self.sync.filter(skip, feedbacks['feedbacks'])
+
         if feedbacks['feedbacks'] is None:
             raise CloseSpider('End of feedbacks reached')
 
-        for feedback in feedbacks['feedbacks']:
+        for feedback in new_feedbacks:
             yield {
                 'text': feedback['text'],
                 'rating': feedback['productValuation'],
@@ -118,56 +222,236 @@ class WildberriesCommentsSpider(BaseSpider):
             }
 
 
-from multiprocessing import Process
-
-def f(runner: CrawlerRunner, link:str) -> None:
+class WildberriesProductsSpider(BaseSpider):
     """
-        Функция, отвечающая за парсинг одного товара
-        @runner:CrawlerRunner - объект раннера
-        @link:str - ссылка на товар Wildberries
+        Паук отзывов сразу нескольких товаров (например категории) за один запуск: страницы товаров и отзывов
+        скачиваются одновременно в пределах CONCURRENT_REQUESTS. Каждый элемент помечен ссылкой товара (product),
+        после последней страницы отзывов товара паук отдает элемент {'product', 'done', 'error'}
     """
-    
-    deferred = runner.crawl(WildberriesCommentsSpider, good_url=link.strip())
-    deferred.addBoth(lambda _: reactor.stop())
-    reactor.run(installSignalHandlers=False)
-    
-    return None
-
-def parse_product(link:str, save_filename:str='data_') -> Tuple[str, str, pd.DataFrame]:
+
+    name = "wb_products_comments"
+
+    def __init__(self, good_urls, *args, **kwargs):
+        super(WildberriesProductsSpider, self).__init__(*args, **kwargs)
+        self.good_urls = list(good_urls)
+
+        # сколько страниц отзывов товара еще не обработано, информация о товарах, взятых из кэша, и синхронизация с хранилищем
+        self.pending = {}
+        self.cached_info = {}
+        self.syncs = {}
+
+    def prepare(self):
+        for url in self.good_urls:
+            info = product_info_cache.get(url)
+
+            # start_requests не может отдавать элементы, поэтому товар без отзывов всегда идет через свою страницу
+            if info is not None and info['feedbacks_count']:
+                self.cached_info[url] = info
+
+        return defer.DeferredList([self.open_sync(url, info) for url, info in self.cached_info.items()])
+
+    def start_requests(self):
+        for url in self.good_urls:
+            if url in self.cached_info:
+                yield from self.feedback_requests(url, self.cached_info[url])
+            else:
+                yield scrapy.Request(url, self.parse_good, errback=self.product_failed, cb_kwargs={'url':url}, dont_filter=True)
+
+    async def parse_good(self, response, url):
+        products_data_js = response.xpath('//script[contains(., "wb.spa.init")]/text()').get()
+
+        info = extract_product_info(products_data_js)
+        if info['imt_id'] is not None:
+            product_info_cache.set(url, info)
+
+        await self.open_sync(url, info)
+        pages = list(self.feedback_requests(url, info))
+
+        output = [*self.info_items(url, info), *pages]
+        if not pages:
+            output.append({'product':url, 'done':True, 'error':None})
+
+        return output
+
+    def open_sync(self, url, info):
+        product = {'url':url, 'name':info['name'], 'photo':info['photo'], 'feedbacks_count':info['feedbacks_count']}
+
+        def opened(sync):
+            self.syncs[url] = sync
+
+        deferred = threads.deferToThread(open_sync, info['imt_id'], info['feedbacks_count'], product)
+        deferred.addCallback(opened)
+
+        return deferred
+
+    def info_items(self, url, info):
+        yield {'product':url, 'name':info['name'], 'photo':info['photo']}
+
+        if self.syncs[url].stored is not None:
+            yield {'product':url, 'stored':self.syncs[url].stored}
+
+    def feedback_requests(self, url, info):
+        sync = self.syncs[url]
+
+        bodies = feedback_request_bodies(info['imt_id'], info['feedbacks_count'], start=sync.start)
+        sync.expect(request_body['skip'] for request_body in bodies)
+        self.pending[url] = len(bodies)
+
+        for request_body in bodies:
+            yield scrapy.Request(FEEDBACKS_URL, self.parse_comments_request, method="POST", body=json.dumps(request_body), errback=self.page_failed, cb_kwargs={'url':url, 'skip':request_body['skip']}, dont_filter=True)
+
+    async def parse_comments_request(self, response, url, skip):
+        # товар уже завершен из-за ошибки на другой странице
+        if self.pending[url] < 0:
+            return []
+
+        output = []
+
+        info = self.cached_info.pop(url, None)
+        if info is not None:
+            output.extend(self.info_items(url, info))
+
+        feedbacks = json.loads(response.text)
+
+        for feedback in self.syncs[url].filter(skip, feedbacks['feedbacks']):
+            output.append({
+                'product': url,
+                'text': feedback['text'],
+                'rating': feedback['productValuation'],
+                'created_at': feedback['createdDate'],
+            })
+
+        # последняя страница: товар завершается после записи в хранилище, чтобы следующий обход товара видел новую отметку
+        if self.pending[url] == 1:
+            await self.commit_sync(self.syncs[url])
+
+        output.extend(self.page_done(url))
+        return output
+
+    def page_done(self, url, error:str=None):
+        self.pending[url] -= 1
+
+        if self.pending[url] == 0 or error is not None:
+            self.pending[url] = -1
+            yield {'product':url, 'done':True, 'error':error}
+
+    def page_failed(self, failure):
+        url = failure.request.cb_kwargs['url']
+
+        # ошибка на одной странице завершает товар один раз, остальные страницы уже ничего не отдают
+        if self.pending.get(url, -1) > 0:
+            yield from self.page_done(url, error=repr(failure.value))
+
+    def product_failed(self, failure):
+        yield {'product':failure.request.cb_kwargs['url'], 'done':True, 'error':repr(failure.value)}
+
+
+def stream_product(link:str) -> FeedbackBuffer:
     '''
-        Функция, отвечающая за создание нового парс процесса и добавление его в очередь
+        Функция постановки парсинга товара в очередь общего сервиса парсинга, отзывы поступают в буфер по мере скачивания страниц
         @link:str - ссылка на товар wb
-        @filename:str - название файла, в который будут сохраняться данные scrapy (его передавать не надо)
     '''
-    filename = save_filename + str(uuid.uuid4()) + '.json'
 
-    runner = CrawlerRunner(settings={
-        "FEEDS": {
-            f"{filename}": {"format": "json"},
-            
-        },
-    })
+    buffer = FeedbackBuffer()
 
-    p = Process(target=f, args=(runner, link))
-    p.start()
-    p.join()
+    future = get_crawler_service().submit(WildberriesCommentsSpider, on_item=buffer.add, good_url=link.strip())
+    future.add_done_callback(lambda future: buffer.close(future.exception()))
 
-    try:
-        with open(f'./{filename}') as data_json:
-            data = json.loads(data_json.read())
-            name, photo = data[0]['name'], data[0]['photo']     
-            data = data[1:]
-            data_json.close()
+    return buffer
+
+def parse_product(link:str, timeout:float=None) -> Tuple[str, str, pd.DataFrame]:
+    '''
+        Функция, отвечающая за парсинг товара и ожидание всех отзывов
+        @link:str - ссылка на товар wb
+        @timeout:float - сколько секунд ждать завершения парсинга (None - без ограничения)
+    '''
 
-        data = pd.DataFrame(data)
-        data.set_axis(['review', 'rate', 'created_at'], axis='columns', inplace=True)
-        data['review'] = data['review'].apply(lambda x: x.strip().replace('\n',''))
-        data.drop(['created_at'], axis='columns', inplace=True)
+    try:
+        buffer = stream_product(link)
+        data = buffer.wait(timeout)
 
-        os.remove(filename)
-        return name, photo, data
+        return buffer.name, buffer.photo, data
 
     except Exception as e:
-        os.remove(filename)
-        logging.error(f'Никита еблоид, парсер не спарсил. Ошибка: {e}')   
-        
\ No newline at end of file
+        logging.error(f'Никита еблоид, парсер не спарсил. Ошибка: {e}')
+
+def crawl_products(links:tp.Iterable[str], concurrency:int=None, timeout:float=None, batch_size:int=50) -> tp.Iterator[tp.Tuple[str, FeedbackBuffer]]:
+    '''
+        Функция парсинга нескольких товаров, возвращает пары (ссылка, буфер отзывов) по мере завершения товаров.
+        Ссылки могут приходить потоком (например из stream_product_category): каждые batch_size ссылок сразу уходят
+        одним запуском паука, не дожидаясь остальных. Если товар не удалось спарсить, buffer.wait() вызовет ошибку
+        @links:tp.Iterable[str] - ссылки на товары wb
+        @concurrency:int - максимальное количество одновременных запросов одного запуска (None - CATEGORY_CONCURRENCY из окружения)
+        @timeout:float - сколько секунд ждать очередной товар (None - без ограничения)
+        @batch_size:int - количество товаров в одном запуске паука
+    '''
+
+    buffers = {}
+    events = queue.Queue()
+
+    if concurrency is None:
+        concurrency = env('CATEGORY_CONCURRENCY', cast=int, default=16)
+
+    def on_item(item):
+        buffer = buffers[item['product']]
+
+        if item.get('done'):
+            buffer.close(RuntimeError(item['error']) if item['error'] is not None else None)
+            events.put(('done', [item['product']], None))
+        else:
+            buffer.add(item)
+
+    def submit(batch:list) -> None:
+        for link in batch:
+            buffers[link] = FeedbackBuffer()
+
+        future = get_crawler_service().submit(
+            WildberriesProductsSpider,
+            settings={'CONCURRENT_REQUESTS':concurrency, 'CONCURRENT_REQUESTS_PER_DOMAIN':concurrency},
+            on_item=on_item,
+            good_urls=batch,
+        )
+        future.add_done_callback(lambda future: events.put(('closed', batch, future)))
+
+    def feed() -> None:
+        batch = []
+
+        try:
+            for link in links:
+                link = link.strip()
+                if link in buffers or link in batch:
+                    continue
+
+                batch.append(link)
+                if len(batch) == batch_size:
+                    submit(batch)
+                    batch = []
+
+            if batch:
+                submit(batch)
+        except Exception as e:
+            logging.error(f'{e} возникла во время получения ссылок на товары')
+        finally:
+            events.put(('fed', [], None))
+
+    threading.Thread(target=feed, name='crawl-products-feed', daemon=True).start()
+
+    done, fed = set(), False
+
+    while not fed or len(done) < len(buffers):
+        kind, batch, future = events.get(timeout=timeout)
+
+        if kind == 'fed':
+            fed = True
+            continue
+
+        for link in batch:
+            if link in done:
+                continue
+
+            # паук закрылся раньше, чем закончился товар
+            if kind == 'closed':
+                buffers[link].close(future.exception() or RuntimeError('Паук закрылся до завершения товара'))
+
+            done.add(link)
+            yield link, buffers[link]